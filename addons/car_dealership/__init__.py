@@ -1,4 +1,6 @@
+from . import controllers
 from . import models
+from . import wizard
 
 def check_sale_installed(cr, registry):
     from odoo.modules.module import module_installed
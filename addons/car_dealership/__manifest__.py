@@ -41,6 +41,9 @@
         'partner_autocomplete',  # This might not be available in your setup
         # 'sale_pdf_quote_builder',  # This might be causing conflicts
     ],
+    'external_dependencies': {
+        'python': ['numpy'],
+    },
     'data': [
         # Security
         # 'security/dealership_security.xml',
@@ -59,6 +62,12 @@
         'views/stock_move_form_views.xml',
         'views/stock_lot_views.xml',
         'views/fleet_vehicle_views.xml',
+        'views/dealership_feed_views.xml',
+        'views/dealership_reconciliation_views.xml',
+        'views/dealership_profiling_views.xml',
+        'views/res_users_views.xml',
+        'wizard/dealership_vehicle_reprice_views.xml',
+        'wizard/dealership_vehicle_settlement_views.xml',
         # 'views/dealership_product_views.xml',
         # 'views/dealership_purchase_views.xml',
         # 'views/dealership_sale_views.xml',
@@ -77,6 +86,10 @@
     'assets': {
         'web.assets_backend': [
             'car_dealership/static/src/css/dealership_styles.css',
+            'car_dealership/static/src/js/vehicle_catalog_service.js',
+            'car_dealership/static/src/js/vehicle_model_select_field.js',
+            'car_dealership/static/src/js/dealership_vehicle_form.js',
+            'car_dealership/static/src/xml/vehicle_model_select_field.xml',
         ],
     },
     'installable': True,
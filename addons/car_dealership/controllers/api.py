@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import json
+import time
+
+from odoo import fields, http
+from odoo.http import request
+from odoo.tools.lru import LRU
+
+from ..tools import vehicle_facets
+from ..tools.replica import call_on_replica
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+RESPONSE_CACHE_TTL = 30
+
+# Fields exposed by the API and how to read them from a vehicle
+API_FIELDS = {
+    'id': lambda vehicle: vehicle.id,
+    'name': lambda vehicle: vehicle.name,
+    'vin': lambda vehicle: vehicle.vin_number or '',
+    'make': lambda vehicle: vehicle.make_id.name or '',
+    'model': lambda vehicle: vehicle.model_id.name or '',
+    'year': lambda vehicle: vehicle.year,
+    'trim': lambda vehicle: vehicle.trim or '',
+    'color': lambda vehicle: vehicle.color or '',
+    'mileage': lambda vehicle: vehicle.mileage,
+    'fuel_type': lambda vehicle: vehicle.fuel_type or '',
+    'transmission': lambda vehicle: vehicle.transmission or '',
+    'condition': lambda vehicle: vehicle.condition or '',
+    'body_type': lambda vehicle: vehicle.fleet_category_id.name or '',
+    'engine_size': lambda vehicle: vehicle.engine_size or '',
+    'price': lambda vehicle: vehicle.selling_price,
+    'currency': lambda vehicle: vehicle.currency_id.name or '',
+    'updated_at': lambda vehicle: fields.Datetime.to_string(vehicle.write_date),
+    # Filled for the whole page at once from the attachment checksums
+    'image_url': None,
+}
+
+# (dbname, etag) -> (expiry, body); shared by all requests of this worker
+_response_cache = LRU(256)
+
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except ValueError:
+        return None
+
+
+class DealershipInventoryApi(http.Controller):
+
+    @http.route('/car_dealership/api/v1/vehicles', type='http', auth='public', methods=['GET'], cors='*')
+    def available_vehicles(self, limit=None, cursor=None, fields=None, **kwargs):
+        """Available vehicles, keyset-paginated on id.
+
+        ``fields`` is a comma separated projection of API_FIELDS, ``cursor``
+        the ``next_cursor`` of the previous page. The ETag only depends on
+        max(write_date) and the count of available vehicles, so an unchanged
+        inventory is answered with a 304 after a single small query. Reads
+        go to the read replica when it is fresh enough.
+        """
+        try:
+            limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        except ValueError:
+            return request.make_json_response({'error': 'invalid limit'}, status=400)
+        last_id = _decode_cursor(cursor)
+        if last_id is None:
+            return request.make_json_response({'error': 'invalid cursor'}, status=400)
+        field_names = [name for name in (fields or '').split(',') if name in API_FIELDS] or list(API_FIELDS)
+        if 'id' not in field_names:
+            field_names.insert(0, 'id')
+
+        max_write_date, count = call_on_replica(
+            request.env, lambda env: env['dealership.vehicle'].sudo()._get_available_inventory_signature())
+        etag = '"%s"' % hashlib.sha1(json.dumps([
+            str(max_write_date), count, limit, last_id, field_names,
+        ]).encode()).hexdigest()
+        headers = [
+            ('ETag', etag),
+            ('Cache-Control', 'public, max-age=0, must-revalidate'),
+        ]
+        if request.httprequest.headers.get('If-None-Match') == etag:
+            return request.make_response('', headers=headers, status=304)
+
+        cache_key = (request.env.cr.dbname, etag)
+        cached = _response_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            body = cached[1]
+        else:
+            body = call_on_replica(request.env, lambda env: self._render_page(
+                env['dealership.vehicle'].sudo(), last_id, limit, field_names, count))
+            _response_cache[cache_key] = (time.monotonic() + RESPONSE_CACHE_TTL, body)
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
+
+    @http.route('/car_dealership/api/v1/vehicles/facets', type='http', auth='public', methods=['GET'], cors='*')
+    def vehicle_facets(self, limit=None, offset=None, **kwargs):
+        """Ids of the available vehicles matching the selected facets, and all facet counts.
+
+        Each facet of ``vehicle_facets.FACETS`` is an optional comma
+        separated list of accepted values, e.g. ``?make_id=3,5&year_band=4``.
+        """
+        try:
+            limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+            offset = max(int(offset or 0), 0)
+            filters = {}
+            for facet in vehicle_facets.FACETS:
+                values = [value for value in (kwargs.get(facet) or '').split(',') if value]
+                if values and facet not in vehicle_facets.SELECTION_FACETS:
+                    values = [int(value) for value in values]
+                if values:
+                    filters[facet] = values
+        except ValueError:
+            return request.make_json_response({'error': 'invalid parameter'}, status=400)
+        result = request.env['dealership.vehicle'].sudo().search_facets(filters, limit=limit, offset=offset)
+        return request.make_json_response(result, headers={'Cache-Control': 'no-cache'})
+
+    def _render_page(self, Vehicle, last_id, limit, field_names, count):
+        vehicles = Vehicle.search([
+            ('state', '=', 'available'),
+            ('is_template_dummy', '=', False),
+            ('id', '>', last_id),
+        ], order='id', limit=limit)
+        data = [
+            {name: API_FIELDS[name](vehicle) for name in field_names if API_FIELDS[name]}
+            for vehicle in vehicles
+        ]
+        if 'image_url' in field_names and vehicles:
+            base_url = Vehicle.get_base_url()
+            main_images, _gallery = vehicles._get_image_checksums()
+            for entry in data:
+                checksum = main_images.get(entry['id'])
+                entry['image_url'] = checksum and '%s/car_dealership/feed/image/%s/%s' % (
+                    base_url, entry['id'], checksum) or ''
+        next_cursor = _encode_cursor(vehicles[-1].id) if len(vehicles) == limit else None
+        return json.dumps({
+            'count': count,
+            'next_cursor': next_cursor,
+            'data': data,
+        }, default=str)
@@ -0,0 +1,61 @@
+from odoo import http
+from odoo.http import request
+from odoo.tools import consteq
+
+
+class DealershipController(http.Controller):
+
+    @http.route('/car_dealership/vehicle_catalog', type='http', auth='user', methods=['GET'])
+    def vehicle_catalog(self, **kwargs):
+        """Return the compact make -> model -> category catalog.
+
+        The catalog version doubles as ETag so the browser only downloads
+        the payload again after a brand or model has been changed.
+        """
+        catalog = request.env['dealership.vehicle']._get_vehicle_catalog()
+        etag = '"%s"' % catalog['v']
+        headers = [
+            ('ETag', etag),
+            ('Cache-Control', 'private, no-cache'),
+        ]
+        if request.httprequest.headers.get('If-None-Match') == etag:
+            return request.make_response('', headers=headers, status=304)
+        return request.make_json_response(catalog, headers=headers)
+
+    @http.route('/car_dealership/feed/<int:feed_id>/<string:token>', type='http', auth='public', methods=['GET'])
+    def feed_download(self, feed_id, token, **kwargs):
+        """Latest exported file of an inventory feed"""
+        feed = request.env['dealership.feed'].sudo().browse(feed_id).exists()
+        if not feed or not feed.access_token or not consteq(feed.access_token, token):
+            raise request.not_found()
+        attachment = feed._get_latest_file()
+        if not attachment:
+            raise request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        return stream.get_response()
+
+    @http.route('/car_dealership/feed/image/<int:vehicle_id>/<string:checksum>', type='http', auth='public', methods=['GET'])
+    def feed_image(self, vehicle_id, checksum, **kwargs):
+        """Main vehicle image addressed by its checksum, cacheable forever"""
+        attachment = request.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'dealership.vehicle'),
+            ('res_field', '=', 'image_1920'),
+            ('res_id', '=', vehicle_id),
+            ('checksum', '=', checksum),
+        ], limit=1)
+        if not attachment:
+            raise request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        return stream.get_response(immutable=True)
+
+    @http.route('/car_dealership/feed/attachment/<int:attachment_id>/<string:checksum>', type='http', auth='public', methods=['GET'])
+    def feed_gallery_image(self, attachment_id, checksum, **kwargs):
+        """Gallery image of a vehicle addressed by its checksum"""
+        request.env.cr.execute("""
+            SELECT 1 FROM dealership_vehicle_image_rel WHERE attachment_id = %s LIMIT 1
+        """, (attachment_id,))
+        attachment = request.env['ir.attachment'].sudo().browse(attachment_id).exists()
+        if not request.env.cr.fetchone() or not attachment or attachment.checksum != checksum:
+            raise request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        return stream.get_response(immutable=True)
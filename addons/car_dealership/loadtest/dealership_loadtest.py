@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the car dealership workflows over JSON-RPC.
+
+Drives a running Odoo (e.g. the docker-compose setup, http://localhost:8068)
+with concurrent "salespeople" and reports, per scenario, the throughput,
+latency percentiles, serialization failures and deadlocks.
+
+    python dealership_loadtest.py seed --db dealership --seed 42
+    python dealership_loadtest.py run --db dealership --seed 42 \\
+        --concurrency 20 --duration 60 --scenario all
+
+Seeding is reproducible: the same seed always creates the same products,
+VINs and stock, and every worker replays the same operation sequence.
+Records created by the harness are prefixed with "LT<seed>" so a database
+can hold several seeds side by side.
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = ['vin_race', 'po_increment', 'sale_line_search', 'delivery_validate']
+# Non North American WMIs: no check digit needed for generated VINs
+WMIS = ['JTD', 'JHM', 'WVW', 'WBA', 'KMH', 'VF1']
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+
+
+class RpcError(Exception):
+    def __init__(self, error):
+        data = error.get('data') or {}
+        self.name = data.get('name') or ''
+        self.message = data.get('message') or error.get('message') or ''
+        self.debug = data.get('debug') or ''
+        super().__init__('%s: %s' % (self.name, self.message))
+
+    @property
+    def kind(self):
+        text = ' '.join([self.name, self.message, self.debug]).lower()
+        if 'deadlock detected' in text:
+            return 'deadlock'
+        if ('could not serialize access' in text or 'serializationfailure' in text
+                or 'concurrent update' in text):
+            return 'serialization'
+        if 'validationerror' in text or 'usererror' in text:
+            return 'rejected'
+        return 'error'
+
+
+class OdooClient:
+    """Minimal JSON-RPC client, one per worker thread"""
+
+    def __init__(self, url, db, login, password, timeout=120):
+        self.url = url.rstrip('/') + '/jsonrpc'
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self.uid = self.call('common', 'login', db, login, password)
+        if not self.uid:
+            raise SystemExit('Login failed for %s on %s' % (login, db))
+
+    def call(self, service, method, *args):
+        payload = json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'id': next(self._ids),
+            'params': {'service': service, 'method': method, 'args': args},
+        }).encode()
+        request = urllib.request.Request(self.url, payload, {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            result = json.loads(response.read())
+        if result.get('error'):
+            raise RpcError(result['error'])
+        return result.get('result')
+
+    def execute(self, model, method, *args, **kwargs):
+        return self.call('object', 'execute_kw', self.db, self.uid, self.password,
+                         model, method, list(args), kwargs)
+
+
+def make_vin(rng, year_code=None):
+    body = ''.join(rng.choice(VIN_CHARS) for _i in range(14))
+    vin = rng.choice(WMIS) + body
+    year_code = year_code or rng.choice(YEAR_CODES[-15:])
+    return vin[:9] + year_code + vin[10:]
+
+
+# ------------------------------------------------------------
+# Seed data
+# ------------------------------------------------------------
+
+def seed(client, args):
+    """Create (or reuse) the reproducible data set of a seed"""
+    rng = random.Random(args.seed)
+    prefix = 'LT%s' % args.seed
+    existing = client.execute('product.template', 'search_read',
+                              [('default_code', '=like', prefix + '-%')], fields=['id'])
+    if existing:
+        print('Seed %s already present (%s products)' % (args.seed, len(existing)))
+        return
+
+    models = client.execute('fleet.vehicle.model', 'search_read', [],
+                            fields=['id', 'brand_id'], order='id')
+    if not models:
+        raise SystemExit('No fleet.vehicle.model found, install fleet demo data first')
+    warehouse = client.execute('stock.warehouse', 'search_read', [],
+                               fields=['lot_stock_id'], limit=1, order='id')[0]
+    stock_location_id = warehouse['lot_stock_id'][0]
+    vendor_id = client.execute('res.partner', 'create', {'name': '%s Vendor' % prefix})
+    client.execute('res.partner', 'create', {'name': '%s Customer' % prefix})
+
+    lots = 0
+    for index in range(args.products):
+        model = rng.choice(models)
+        year = rng.randint(2012, 2024)
+        template_id = client.execute('product.template', 'create', {
+            'name': '%s Vehicle %03d' % (prefix, index),
+            'default_code': '%s-%03d' % (prefix, index),
+            'type': 'consu',
+            'is_storable': True,
+            'tracking': 'serial',
+            'is_vehicle': True,
+            'make_id': model['brand_id'][0],
+            'model_id': model['id'],
+            'year': year,
+            'list_price': rng.randrange(5000, 60000, 500),
+            'standard_price': rng.randrange(4000, 50000, 500),
+            'seller_ids': [(0, 0, {'partner_id': vendor_id})],
+        })
+        product_id = client.execute('product.product', 'search',
+                                    [('product_tmpl_id', '=', template_id)], limit=1)[0]
+        quant_vals = []
+        for _serial in range(args.units):
+            vin = make_vin(rng, YEAR_CODES[(year - 1980) % 30])
+            lot_id = client.execute('stock.lot', 'create', {'name': vin, 'product_id': product_id})
+            quant_vals.append({
+                'product_id': product_id,
+                'location_id': stock_location_id,
+                'lot_id': lot_id,
+                'inventory_quantity': 1,
+            })
+            lots += 1
+        quant_ids = client.execute('stock.quant', 'create', quant_vals)
+        client.execute('stock.quant', 'action_apply_inventory', quant_ids)
+    print('Seeded %s vehicle products and %s serials for seed %s' % (args.products, lots, args.seed))
+
+
+# ------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------
+
+class Context:
+    """Data shared by the workers of a run, read once after seeding"""
+
+    def __init__(self, client, args):
+        prefix = 'LT%s' % args.seed
+        self.prefix = prefix
+        self.products = client.execute(
+            'product.product', 'search_read', [('default_code', '=like', prefix + '-%')],
+            fields=['id', 'make_id', 'model_id', 'year'], order='id')
+        if not self.products:
+            raise SystemExit('Seed %s not found, run the "seed" command first' % args.seed)
+        self.vendor_id = client.execute('res.partner', 'search', [('name', '=', '%s Vendor' % prefix)], limit=1)[0]
+        self.customer_id = client.execute('res.partner', 'search', [('name', '=', '%s Customer' % prefix)], limit=1)[0]
+        # Small pool so concurrent workers collide on purpose
+        pool_rng = random.Random(args.seed)
+        self.race_vins = [make_vin(pool_rng) for _i in range(max(args.concurrency // 2, 2))]
+
+
+def scenario_vin_race(client, context, rng):
+    """Concurrent creation of vehicles sharing a few VINs"""
+    product = rng.choice(context.products)
+    client.execute('dealership.vehicle', 'create', {
+        'name': '%s race' % context.prefix,
+        'vin_number': rng.choice(context.race_vins),
+        'is_template_dummy': False,
+        'make_id': product['make_id'][0],
+        'model_id': product['model_id'][0],
+        'year': product['year'],
+    })
+
+
+def scenario_po_increment(client, context, rng):
+    """Concurrent purchase orders on the same vehicle products.
+
+    Exercises the standard purchase flow only: the dealership override in
+    models/purchase_order.py is not loaded (see models/__init__.py).
+    """
+    product = rng.choice(context.products[:3])
+    client.execute('purchase.order', 'create', {
+        'partner_id': context.vendor_id,
+        'order_line': [(0, 0, {'product_id': product['id'], 'product_qty': rng.randint(1, 3)})],
+    })
+
+
+def scenario_sale_line_search(client, context, rng):
+    """Dropdown searches of the sale order line product and vehicle fields.
+
+    The product search runs the standard name_search: the
+    from_sale_order_line override in models/product_product.py is not
+    loaded (see models/__init__.py).
+    """
+    term = rng.choice(['', context.prefix, 'Vehicle', '0'])
+    client.execute('product.product', 'name_search', term,
+                   limit=8, context={'from_sale_order_line': True})
+    client.execute('dealership.vehicle', 'name_search', term,
+                   domain=[('state', '=', 'available')], limit=8)
+
+
+def scenario_delivery_validate(client, context, rng):
+    """Sell one unit and validate its delivery"""
+    product = rng.choice(context.products)
+    order_id = client.execute('sale.order', 'create', {
+        'partner_id': context.customer_id,
+        'order_line': [(0, 0, {'product_id': product['id'], 'product_uom_qty': 1})],
+    })
+    client.execute('sale.order', 'action_confirm', [order_id])
+    picking_ids = client.execute('sale.order', 'read', [order_id], ['picking_ids'])[0]['picking_ids']
+    for picking_id in picking_ids:
+        client.execute('stock.picking', 'action_assign', [picking_id])
+        line_ids = client.execute('stock.move.line', 'search', [('picking_id', '=', picking_id)])
+        if line_ids:
+            client.execute('stock.move.line', 'write', line_ids, {'picked': True})
+        client.execute('stock.picking', 'button_validate', [picking_id])
+
+
+SCENARIO_FUNCTIONS = {
+    'vin_race': scenario_vin_race,
+    'po_increment': scenario_po_increment,
+    'sale_line_search': scenario_sale_line_search,
+    'delivery_validate': scenario_delivery_validate,
+}
+
+
+# ------------------------------------------------------------
+# Runner and report
+# ------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.samples = defaultdict(dict)
+
+    def record(self, scenario, latency, outcome, sample=None):
+        with self.lock:
+            if outcome == 'ok':
+                self.latencies[scenario].append(latency)
+            self.outcomes[scenario][outcome] += 1
+            if sample and outcome not in self.samples[scenario]:
+                self.samples[scenario][outcome] = sample
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def worker(worker_id, args, scenarios, context, stats, deadline):
+    client = OdooClient(args.url, args.db, args.login, args.password)
+    rng = random.Random('%s-%s' % (args.seed, worker_id))
+    iterations = 0
+    while time.monotonic() < deadline and (not args.iterations or iterations < args.iterations):
+        iterations += 1
+        scenario = rng.choice(scenarios)
+        started = time.perf_counter()
+        try:
+            SCENARIO_FUNCTIONS[scenario](client, context, rng)
+        except RpcError as error:
+            stats.record(scenario, time.perf_counter() - started, error.kind, error.message)
+        except OSError as error:
+            stats.record(scenario, time.perf_counter() - started, 'transport', str(error))
+        else:
+            stats.record(scenario, time.perf_counter() - started, 'ok')
+
+
+def check_duplicate_vins(client, context):
+    groups = client.execute('dealership.vehicle', 'read_group',
+                            [('vin_number', 'in', context.race_vins)],
+                            ['vin_number'], ['vin_number'])
+    return sum(1 for group in groups if group['vin_number_count'] > 1)
+
+
+def run(client, args):
+    scenarios = SCENARIOS if args.scenario == 'all' else args.scenario.split(',')
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit('Unknown scenario(s): %s' % ', '.join(sorted(unknown)))
+    context = Context(client, args)
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(worker, worker_id, args, scenarios, context, stats, deadline)
+                   for worker_id in range(args.concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = time.monotonic() - started
+
+    report = {
+        'seed': args.seed,
+        'concurrency': args.concurrency,
+        'elapsed': round(elapsed, 2),
+        'scenarios': {},
+    }
+    for scenario in scenarios:
+        latencies = stats.latencies[scenario]
+        outcomes = stats.outcomes[scenario]
+        report['scenarios'][scenario] = {
+            'ok': outcomes['ok'],
+            'throughput': round(outcomes['ok'] / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p90_ms': round(percentile(latencies, 90) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+            'serialization_failures': outcomes['serialization'],
+            'deadlocks': outcomes['deadlock'],
+            'rejected': outcomes['rejected'],
+            'errors': outcomes['error'] + outcomes['transport'],
+            'error_samples': stats.samples[scenario],
+        }
+    if 'vin_race' in scenarios:
+        report['scenarios']['vin_race']['duplicate_vins'] = check_duplicate_vins(client, context)
+    return report
+
+
+def print_report(report):
+    header = '%-18s %7s %8s %8s %8s %8s %8s %6s %6s %6s %6s' % (
+        'scenario', 'ok', 'req/s', 'p50ms', 'p90ms', 'p95ms', 'p99ms',
+        'serial', 'dlock', 'reject', 'error')
+    print('Seed %(seed)s, %(concurrency)s workers, %(elapsed)ss' % report)
+    print(header)
+    print('-' * len(header))
+    for scenario, row in report['scenarios'].items():
+        print('%-18s %7d %8.2f %8.1f %8.1f %8.1f %8.1f %6d %6d %6d %6d' % (
+            scenario, row['ok'], row['throughput'], row['p50_ms'], row['p90_ms'],
+            row['p95_ms'], row['p99_ms'], row['serialization_failures'],
+            row['deadlocks'], row['rejected'], row['errors']))
+        if row.get('duplicate_vins'):
+            print('  !! %s VINs were stored more than once' % row['duplicate_vins'])
+        for outcome, sample in row['error_samples'].items():
+            print('  %s: %s' % (outcome, sample.splitlines()[0][:160] if sample else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['seed', 'run'])
+    parser.add_argument('--url', default='http://localhost:8068')
+    parser.add_argument('--db', default='dealership')
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--products', type=int, default=10, help='vehicle products to seed')
+    parser.add_argument('--units', type=int, default=20, help='serials in stock per product')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds')
+    parser.add_argument('--iterations', type=int, default=0, help='per worker, 0 = unlimited')
+    parser.add_argument('--scenario', default='all',
+                        help='comma separated list of %s, or "all"' % ', '.join(SCENARIOS))
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args(argv)
+
+    client = OdooClient(args.url, args.db, args.login, args.password)
+    if args.command == 'seed':
+        seed(client, args)
+        return 0
+    report = run(client, args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,17 @@
 from . import dealership_vehicle
+from . import fleet_vehicle_model
+from . import dealership_feed
+from . import dealership_reconciliation
+from . import dealership_profiling
+from . import dealership_telematics
 from . import product_template
+from . import res_currency
+from . import res_users
 from . import stock_picking
 # from . import stock_move
 from . import stock_lot
 from . import stock_picking_pop_up
+from . import ir_actions_report
+from . import account_move_line
 # from . import sale_order_line
 # from . import product_product
@@ -4,4 +4,4 @@ from odoo import models, fields, api
 class AccountMoveLine(models.Model):
     _inherit = 'account.move.line'
 
-    vehicle_id = fields.Many2one('dealership.vehicle', string='Vehicle')
+    vehicle_id = fields.Many2one('dealership.vehicle', string='Vehicle', index='btree_not_null')
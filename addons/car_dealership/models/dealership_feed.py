@@ -0,0 +1,328 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.tools import config
+from ..tools.replica import call_on_replica
+from xml.sax.saxutils import escape, quoteattr
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+_logger = logging.getLogger(__name__)
+
+FEED_CHUNK_SIZE = 1000
+# Re-read this many seconds before the watermark so rows committed by
+# transactions that started before the previous export are not missed.
+WATERMARK_OVERLAP = 300
+COPY_BLOCK_SIZE = 1024 * 1024
+# Directory the target directories of the feeds are resolved in, defaults to
+# dealership_feeds/<database> in the data directory
+EXPORT_ROOT_PARAM = 'car_dealership.feed_export_root'
+
+FEED_FIELDS = [
+    'id', 'status', 'name', 'vin', 'make', 'model', 'year', 'trim', 'color',
+    'mileage', 'fuel_type', 'transmission', 'condition', 'body_type',
+    'engine_size', 'price', 'currency', 'updated_at', 'image_url', 'gallery_urls',
+]
+
+
+class DealershipFeed(models.Model):
+    """Inventory feed pushed to marketplaces and the website"""
+    _name = 'dealership.feed'
+    _description = 'Dealership Inventory Feed'
+    _order = 'name'
+
+    name = fields.Char('Feed Name', required=True)
+    active = fields.Boolean(default=True)
+    feed_format = fields.Selection([
+        ('json', 'JSON'),
+        ('csv', 'CSV'),
+        ('xml', 'XML'),
+    ], string='Format', default='json', required=True)
+    mode = fields.Selection([
+        ('full', 'Full'),
+        ('delta', 'Delta'),
+    ], string='Mode', default='delta', required=True,
+        help="Delta feeds only contain vehicles created, changed or sold since the last export.")
+    watermark = fields.Datetime(
+        'Watermark', readonly=True, copy=False,
+        help="Start of the last export; the next delta export reads changes after it.")
+    target_directory = fields.Char(
+        'Target Directory',
+        help="Optional directory the feed file is also written to, relative to the "
+             "feed export root (system parameter car_dealership.feed_export_root).")
+    keep_files = fields.Integer(
+        'Files to Keep', default=48,
+        help="Number of exported files kept in the filestore.")
+    access_token = fields.Char(
+        'Access Token', copy=False, default=lambda self: uuid.uuid4().hex)
+    last_export_date = fields.Datetime('Last Export', readonly=True, copy=False)
+    last_export_count = fields.Integer('Vehicles in Last Export', readonly=True, copy=False)
+    attachment_ids = fields.One2many(
+        'ir.attachment', 'res_id', string='Exported Files',
+        domain=[('res_model', '=', 'dealership.feed')], readonly=True)
+    feed_url = fields.Char('Feed URL', compute='_compute_feed_url')
+
+    @api.constrains('target_directory')
+    def _check_target_directory(self):
+        for feed in self.filtered('target_directory'):
+            feed._get_target_path()
+
+    def _get_export_root(self):
+        root = self.env['ir.config_parameter'].sudo().get_param(EXPORT_ROOT_PARAM) or os.path.join(
+            config['data_dir'], 'dealership_feeds', self.env.cr.dbname)
+        return os.path.realpath(root)
+
+    def _get_target_path(self):
+        """Absolute target directory, which must stay inside the export root"""
+        self.ensure_one()
+        root = self._get_export_root()
+        path = os.path.realpath(os.path.join(root, self.target_directory))
+        if os.path.commonpath([root, path]) != root:
+            raise ValidationError(_('The target directory of a feed must be inside %s.', root))
+        return path
+
+    def _get_filename(self, started_at):
+        slug = re.sub(r'[^a-z0-9]+', '_', self.name.lower()).strip('_') or 'feed'
+        return '%s-%s.%s' % (slug, started_at.strftime('%Y%m%d%H%M%S'), self.feed_format)
+
+    def _compute_feed_url(self):
+        base_url = self.get_base_url()
+        for feed in self:
+            feed.feed_url = feed.id and '%s/car_dealership/feed/%s/%s' % (
+                base_url, feed.id, feed.access_token)
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+
+    def _get_feed_domain(self, since=None):
+        if since:
+            return [
+                ('is_template_dummy', '=', False),
+                ('state', 'in', ['available', 'sold']),
+                ('write_date', '>', since),
+            ]
+        return [('is_template_dummy', '=', False), ('state', '=', 'available')]
+
+    def _iter_feed_vehicles(self, since=None):
+        """Yield one feed entry per vehicle, reading in keyset-paginated chunks.
+
+        Images are referenced by URLs containing the attachment checksum, so
+        they stay stable until the image itself changes.
+        """
+        Vehicle = self.env['dealership.vehicle']
+        base_url = self.get_base_url()
+        domain = self._get_feed_domain(since)
+        last_id = 0
+        while True:
+            vehicles = Vehicle.search(domain + [('id', '>', last_id)], order='id', limit=FEED_CHUNK_SIZE)
+            if not vehicles:
+                return
+            main_images, gallery = vehicles._get_image_checksums()
+            for vehicle in vehicles:
+                checksum = main_images.get(vehicle.id)
+                yield {
+                    'id': vehicle.id,
+                    'status': vehicle.state,
+                    'name': vehicle.name,
+                    'vin': vehicle.vin_number or '',
+                    'make': vehicle.make_id.name or '',
+                    'model': vehicle.model_id.name or '',
+                    'year': vehicle.year,
+                    'trim': vehicle.trim or '',
+                    'color': vehicle.color or '',
+                    'mileage': vehicle.mileage,
+                    'fuel_type': vehicle.fuel_type or '',
+                    'transmission': vehicle.transmission or '',
+                    'condition': vehicle.condition or '',
+                    'body_type': vehicle.fleet_category_id.name or '',
+                    'engine_size': vehicle.engine_size or '',
+                    'price': vehicle.selling_price,
+                    'currency': vehicle.currency_id.name or '',
+                    'updated_at': fields.Datetime.to_string(vehicle.write_date),
+                    'image_url': checksum and '%s/car_dealership/feed/image/%s/%s' % (
+                        base_url, vehicle.id, checksum) or '',
+                    'gallery_urls': [
+                        '%s/car_dealership/feed/attachment/%s/%s' % (base_url, attachment_id, att_checksum)
+                        for attachment_id, att_checksum in gallery.get(vehicle.id, [])
+                    ],
+                }
+            last_id = vehicles[-1].id
+            # Keep memory bounded whatever the size of the inventory
+            vehicles.invalidate_recordset()
+
+    # ------------------------------------------------------------
+    # Serializers
+    # ------------------------------------------------------------
+
+    def _serialize_json(self, entries, header):
+        yield '{"generated_at": %s, "mode": %s, "vehicles": [' % (
+            json.dumps(header['generated_at']), json.dumps(header['mode']))
+        separator = ''
+        for entry in entries:
+            yield separator + json.dumps(entry, default=str)
+            separator = ','
+        yield ']}'
+
+    def _serialize_csv(self, entries, header):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(FEED_FIELDS)
+        for entry in entries:
+            entry = dict(entry, gallery_urls=' '.join(entry['gallery_urls']))
+            writer.writerow([entry[field] for field in FEED_FIELDS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def _serialize_xml(self, entries, header):
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n<vehicles generated_at=%s mode=%s>\n' % (
+            quoteattr(header['generated_at']), quoteattr(header['mode']))
+        for entry in entries:
+            parts = ['<vehicle>']
+            for field in FEED_FIELDS:
+                if field == 'gallery_urls':
+                    parts.append('<gallery>%s</gallery>' % ''.join(
+                        '<url>%s</url>' % escape(url) for url in entry[field]))
+                else:
+                    parts.append('<%s>%s</%s>' % (field, escape(str(entry[field])), field))
+            parts.append('</vehicle>\n')
+            yield ''.join(parts)
+        yield '</vehicles>\n'
+
+    # ------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------
+
+    def _export_feed(self):
+        """Stream the feed to a temporary file and store it in the filestore"""
+        self.ensure_one()
+        self.env.cr.execute("SELECT (now() at time zone 'UTC')")
+        started_at = self.env.cr.fetchone()[0]
+        since = None
+        if self.mode == 'delta' and self.watermark:
+            since = fields.Datetime.subtract(self.watermark, seconds=WATERMARK_OVERLAP)
+        header = {
+            'generated_at': fields.Datetime.to_string(started_at),
+            'mode': 'delta' if since else 'full',
+        }
+
+        serializer_name = '_serialize_%s' % self.feed_format
+
+        def render(env):
+            count = 0
+
+            def counted(entries):
+                nonlocal count
+                for entry in entries:
+                    count += 1
+                    yield entry
+
+            feed = self.with_env(env)
+            tmp = tempfile.TemporaryFile()
+            try:
+                for chunk in getattr(feed, serializer_name)(counted(feed._iter_feed_vehicles(since)), header):
+                    tmp.write(chunk.encode())
+            except Exception:
+                tmp.close()
+                raise
+            return tmp, count
+
+        # A lag below the overlap keeps delta exports from the replica complete
+        tmp, count = call_on_replica(self.env, render, max_lag=WATERMARK_OVERLAP)
+        filename = self._get_filename(started_at)
+        with tmp:
+            self._store_feed_file(filename, tmp)
+            if self.target_directory:
+                self._write_to_target_directory(filename, tmp)
+        self.write({
+            'watermark': started_at,
+            'last_export_date': started_at,
+            'last_export_count': count,
+        })
+        self._gc_feed_files()
+        _logger.info("Exported %s vehicles to feed %s (%s)", count, self.name, header['mode'])
+        return count
+
+    def _store_feed_file(self, filename, tmp):
+        """Attach the exported file, copied to the filestore block by block"""
+        Attachment = self.env['ir.attachment']
+        vals = {
+            'name': filename,
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': {
+                'json': 'application/json',
+                'csv': 'text/csv',
+                'xml': 'application/xml',
+            }[self.feed_format],
+        }
+        tmp.seek(0)
+        if Attachment._storage() == 'db':
+            return Attachment.create(dict(vals, raw=tmp.read()))
+
+        sha = hashlib.sha1()
+        size = 0
+        for block in iter(lambda: tmp.read(COPY_BLOCK_SIZE), b''):
+            sha.update(block)
+            size += len(block)
+        checksum = sha.hexdigest()
+        fname, full_path = Attachment._get_path(b'', checksum)
+        if not os.path.exists(full_path):
+            tmp.seek(0)
+            with open(full_path + '.part', 'wb') as target:
+                shutil.copyfileobj(tmp, target, COPY_BLOCK_SIZE)
+            os.replace(full_path + '.part', full_path)
+        # Collected by the filestore gc if the transaction rolls back
+        Attachment._mark_for_gc(fname)
+        return Attachment.create(dict(vals, store_fname=fname, checksum=checksum, file_size=size))
+
+    def _write_to_target_directory(self, filename, tmp):
+        directory = self._get_target_path()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, filename)
+        # Write then rename so consumers never read a partial file
+        tmp.seek(0)
+        with open(path + '.part', 'wb') as target:
+            shutil.copyfileobj(tmp, target, COPY_BLOCK_SIZE)
+        os.replace(path + '.part', path)
+
+    def _gc_feed_files(self):
+        self.ensure_one()
+        attachments = self.env['ir.attachment'].search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+        ], order='id desc', offset=max(self.keep_files, 1))
+        attachments.unlink()
+
+    def _get_latest_file(self):
+        self.ensure_one()
+        return self.env['ir.attachment'].search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+        ], order='id desc', limit=1)
+
+    def action_export(self):
+        for feed in self:
+            feed._export_feed()
+        return True
+
+    def action_reset_watermark(self):
+        self.write({'watermark': False})
+
+    @api.model
+    def _cron_export_feeds(self):
+        for feed in self.search([]):
+            try:
+                with self.env.cr.savepoint():
+                    feed._export_feed()
+            except Exception:
+                _logger.exception("Export of feed %s failed", feed.name)
@@ -0,0 +1,158 @@
+from odoo import models, fields, api, tools, _
+from ..tools import profiling
+from datetime import timedelta, timezone
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class DealershipProfilingRule(models.Model):
+    """Which calls of the profiled entry points are recorded"""
+    _name = 'dealership.profiling.rule'
+    _description = 'Dealership Profiling Rule'
+    _order = 'id desc'
+
+    name = fields.Char('Description', required=True)
+    active = fields.Boolean(default=True)
+    user_id = fields.Many2one(
+        'res.users', string='User', ondelete='cascade',
+        help="Only profile the calls of this user; all users when empty.")
+    target = fields.Selection(
+        selection='_get_target_selection', string='Method',
+        help="Only profile this method; all profiled methods when empty.")
+    sample_rate = fields.Float(
+        'Sampling Rate', default=1.0,
+        help="Share of the matching calls that are profiled, between 0 and 1.")
+    date_end = fields.Datetime(
+        'Active Until', default=lambda self: fields.Datetime.now() + timedelta(hours=1),
+        help="The rule stops profiling after this date.")
+    profile_ids = fields.One2many('dealership.profiling.profile', 'rule_id', string='Profiles')
+    profile_count = fields.Integer('Profile Count', compute='_compute_profile_count')
+
+    _sql_constraints = [
+        ('sample_rate_range', 'CHECK(sample_rate > 0 AND sample_rate <= 1)',
+         'The sampling rate must be greater than 0 and at most 1.'),
+    ]
+
+    @api.model
+    def _get_target_selection(self):
+        return [(target, target) for target in sorted(profiling.TARGETS)]
+
+    def _compute_profile_count(self):
+        counts = dict(self.env['dealership.profiling.profile']._read_group(
+            [('rule_id', 'in', self.ids)], ['rule_id'], ['__count']))
+        for rule in self:
+            rule.profile_count = counts.get(rule, 0)
+
+    @api.model
+    @tools.ormcache()
+    def _get_active_rules(self):
+        """Tuple of (id, user id, target, sampling rate, end timestamp) of the active rules.
+
+        Datetimes are naive UTC in the database, the end timestamp is
+        compared to time.time() so it must not be read as local time.
+        """
+        rules = self.sudo().search([])
+        return tuple(
+            (rule.id, rule.user_id.id, rule.target or None, rule.sample_rate,
+             rule.date_end and rule.date_end.replace(tzinfo=timezone.utc).timestamp())
+            for rule in rules
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rules = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return rules
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env.registry.clear_cache()
+        return result
+
+    def action_view_profiles(self):
+        self.ensure_one()
+        return {
+            'name': _('Profiles of %s', self.name),
+            'type': 'ir.actions.act_window',
+            'res_model': 'dealership.profiling.profile',
+            'view_mode': 'list,form',
+            'domain': [('rule_id', '=', self.id)],
+        }
+
+
+class DealershipProfilingProfile(models.Model):
+    """One profiled call: timings, SQL summary and flamegraph files"""
+    _name = 'dealership.profiling.profile'
+    _description = 'Dealership Profile'
+    _order = 'id desc'
+    _rec_name = 'target'
+
+    rule_id = fields.Many2one('dealership.profiling.rule', string='Rule', ondelete='set null', index=True)
+    user_id = fields.Many2one('res.users', string='User', ondelete='set null')
+    target = fields.Char('Method', readonly=True)
+    failed = fields.Boolean('Raised', readonly=True, help="The profiled call raised an exception.")
+    duration = fields.Float('Duration (ms)', readonly=True, digits=(16, 1))
+    sql_count = fields.Integer('Queries', readonly=True)
+    sql_time = fields.Float('SQL Time (ms)', readonly=True, digits=(16, 1))
+    record_cache_misses = fields.Integer(
+        'Record Cache Misses', readonly=True,
+        help="Queries issued to load fields missing from the record cache.")
+    ormcache_misses = fields.Integer(
+        'ORM Cache Misses', readonly=True,
+        help="ormcache misses of the database during the call (includes other requests of the worker).")
+    worker_pid = fields.Integer('Worker PID', readonly=True)
+    sql_summary = fields.Text('Slowest Statements', readonly=True)
+    samples_folded = fields.Binary('Python Flamegraph', attachment=True, readonly=True)
+    samples_folded_name = fields.Char('Python Flamegraph Name')
+    sql_folded = fields.Binary('SQL Flamegraph', attachment=True, readonly=True)
+    sql_folded_name = fields.Char('SQL Flamegraph Name')
+
+    @api.model
+    def _gc_profiles(self):
+        """Apply the retention limits: age in days and number of profiles kept"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        retention_days = int(ICP.get_param('car_dealership.profiling_retention_days', 7))
+        max_profiles = int(ICP.get_param('car_dealership.profiling_max_profiles', 500))
+        expired = self.search([('create_date', '<', fields.Datetime.now() - timedelta(days=retention_days))])
+        expired |= self.search([], offset=max_profiles)
+        _logger.info("Removing %s dealership profiles", len(expired))
+        expired.unlink()
+
+
+class SaleOrderLine(models.Model):
+    # Profiled entry points only: the dealership sale line logic lives in
+    # sale_order_line.py, which is not loaded
+    _inherit = 'sale.order.line'
+
+    @api.model_create_multi
+    @profiling.profiled('sale.order.line')
+    def create(self, vals_list):
+        return super().create(vals_list)
+
+    @profiling.profiled('sale.order.line')
+    def write(self, vals):
+        return super().write(vals)
+
+    @profiling.profiled('sale.order.line')
+    def onchange(self, *args, **kwargs):
+        return super().onchange(*args, **kwargs)
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    @api.model
+    @profiling.profiled('product.product')
+    def search(self, domain, *args, **kwargs):
+        return super().search(domain, *args, **kwargs)
+
+    @api.model
+    @profiling.profiled('product.product')
+    def name_search(self, *args, **kwargs):
+        return super().name_search(*args, **kwargs)
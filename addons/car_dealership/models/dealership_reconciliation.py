@@ -0,0 +1,318 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+MOVE_CURSOR_PARAM = 'car_dealership.reconciliation_move_cursor'
+
+# Serials on hand in internal locations of vehicle products, matched on
+# (product, VIN) with the per-VIN dealership vehicles. Only rows that
+# disagree are returned.
+SERIAL_DISCREPANCY_QUERY = """
+    WITH on_hand AS (
+        SELECT q.product_id, q.lot_id, lot.name AS vin,
+               MIN(q.location_id) AS location_id, MIN(loc.warehouse_id) AS warehouse_id
+          FROM stock_quant q
+          JOIN stock_location loc ON loc.id = q.location_id
+          JOIN stock_lot lot ON lot.id = q.lot_id
+          JOIN product_product pp ON pp.id = q.product_id
+          JOIN product_template pt ON pt.id = pp.product_tmpl_id
+         WHERE loc.usage = 'internal'
+           AND pt.is_vehicle
+           AND (%(product_ids)s IS NULL OR q.product_id = ANY(%(product_ids)s))
+         GROUP BY q.product_id, q.lot_id, lot.name
+        HAVING SUM(q.quantity) > 0
+    ), vehicles AS (
+        SELECT veh.id, veh.product_id, veh.vin_number, veh.state, veh.branch_id, lot.id AS lot_id
+          FROM dealership_vehicle veh
+          LEFT JOIN stock_lot lot ON lot.product_id = veh.product_id AND lot.name = veh.vin_number
+         WHERE NOT COALESCE(veh.is_template_dummy, false)
+           AND veh.vin_number IS NOT NULL
+           AND (%(product_ids)s IS NULL OR veh.product_id = ANY(%(product_ids)s))
+    )
+    SELECT CASE WHEN veh.id IS NULL THEN 'missing_vehicle'
+                WHEN hand.lot_id IS NULL THEN 'not_on_hand'
+                WHEN veh.state != 'available' THEN 'state_mismatch'
+                ELSE 'branch_mismatch'
+           END,
+           COALESCE(hand.product_id, veh.product_id), COALESCE(hand.lot_id, veh.lot_id), veh.id,
+           hand.location_id, hand.warehouse_id, veh.state
+      FROM on_hand hand
+      FULL OUTER JOIN vehicles veh ON veh.product_id = hand.product_id AND veh.vin_number = hand.vin
+     WHERE veh.id IS NULL
+        OR (hand.lot_id IS NULL AND veh.state = 'available')
+        OR (hand.lot_id IS NOT NULL AND veh.state != 'available')
+        OR (hand.lot_id IS NOT NULL AND veh.branch_id IS DISTINCT FROM hand.warehouse_id)
+"""
+
+# Template vehicles count the units of their product on hand, per-VIN
+# vehicles are always one unit
+QUANTITY_DISCREPANCY_QUERY = """
+    SELECT veh.id, veh.product_id, COALESCE(veh.quantity, 0),
+           CASE WHEN veh.is_template_dummy THEN COALESCE(hand.serials, 0) ELSE 1 END
+      FROM dealership_vehicle veh
+      LEFT JOIN (
+            SELECT q.product_id, COUNT(DISTINCT q.lot_id) AS serials
+              FROM stock_quant q
+              JOIN stock_location loc ON loc.id = q.location_id
+             WHERE loc.usage = 'internal' AND q.quantity > 0
+               AND (%(product_ids)s IS NULL OR q.product_id = ANY(%(product_ids)s))
+             GROUP BY q.product_id
+           ) hand ON hand.product_id = veh.product_id
+     WHERE veh.product_id IS NOT NULL
+       AND (%(product_ids)s IS NULL OR veh.product_id = ANY(%(product_ids)s))
+       AND COALESCE(veh.quantity, 0) != CASE WHEN veh.is_template_dummy
+                                             THEN COALESCE(hand.serials, 0) ELSE 1 END
+"""
+
+
+class DealershipReconciliation(models.Model):
+    """Comparison of stock on hand with the dealership vehicles"""
+    _name = 'dealership.reconciliation'
+    _description = 'Dealership Stock Reconciliation'
+    _order = 'id desc'
+
+    name = fields.Char('Reference', required=True, readonly=True, copy=False,
+                       default=lambda self: _('Reconciliation %s', fields.Datetime.to_string(fields.Datetime.now())))
+    mode = fields.Selection([
+        ('incremental', 'Incremental'),
+        ('full', 'Full'),
+    ], string='Mode', default='full', required=True,
+        help="Incremental runs only check the products moved since the last reconciled stock move.")
+    auto_correct = fields.Boolean(
+        'Auto-correct',
+        help="Fix the vehicles where stock tells unambiguously what they should be.")
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], string='Status', default='draft', readonly=True, copy=False)
+    date = fields.Datetime('Run On', readonly=True, copy=False)
+    from_move_id = fields.Integer('From Stock Move', readonly=True, copy=False)
+    to_move_id = fields.Integer('Up to Stock Move', readonly=True, copy=False)
+    product_count = fields.Integer('Products Checked', readonly=True, copy=False)
+    line_ids = fields.One2many(
+        'dealership.reconciliation.line', 'reconciliation_id', string='Discrepancies', readonly=True)
+    line_count = fields.Integer('Discrepancies', compute='_compute_line_counts')
+    corrected_count = fields.Integer('Corrected', compute='_compute_line_counts')
+
+    @api.depends('line_ids.corrected')
+    def _compute_line_counts(self):
+        counts = {
+            (reconciliation.id, corrected): count
+            for reconciliation, corrected, count in self.env['dealership.reconciliation.line']._read_group(
+                [('reconciliation_id', 'in', self.ids)], ['reconciliation_id', 'corrected'], ['__count'])
+        }
+        for reconciliation in self:
+            corrected = counts.get((reconciliation.id, True), 0)
+            reconciliation.line_count = corrected + counts.get((reconciliation.id, False), 0)
+            reconciliation.corrected_count = corrected
+
+    # ------------------------------------------------------------
+    # Scope
+    # ------------------------------------------------------------
+
+    def _get_move_scope(self):
+        """(product ids or None for all, first move id, last reconciled move id)
+
+        The new cursor stops before the oldest move not done nor cancelled,
+        drafts included, so a move validated after this run is picked up by
+        the next one.
+        """
+        cr = self.env.cr
+        last_move_id = 0
+        if self.mode == 'incremental':
+            last_move_id = int(self.env['ir.config_parameter'].sudo().get_param(MOVE_CURSOR_PARAM, 0))
+        cr.execute("""
+            SELECT MIN(id) FILTER (WHERE state NOT IN ('done', 'cancel')), COALESCE(MAX(id), 0)
+              FROM stock_move
+             WHERE id > %s
+        """, (last_move_id,))
+        pending_move_id, max_move_id = cr.fetchone()
+        to_move_id = pending_move_id - 1 if pending_move_id else max(max_move_id, last_move_id)
+        if self.mode == 'full':
+            return None, 0, to_move_id
+        cr.execute("""
+            SELECT DISTINCT product_id FROM stock_move
+             WHERE id > %s AND state = 'done'
+        """, (last_move_id,))
+        return [row[0] for row in cr.fetchall()], last_move_id, to_move_id
+
+    # ------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------
+
+    def action_run(self):
+        for reconciliation in self.filtered(lambda rec: rec.state == 'draft'):
+            reconciliation._run()
+        return True
+
+    def _run(self):
+        self.ensure_one()
+        self.env.flush_all()
+        product_ids, from_move_id, to_move_id = self._get_move_scope()
+        line_vals = []
+        if product_ids is None or product_ids:
+            params = {'product_ids': product_ids}
+            self.env.cr.execute(SERIAL_DISCREPANCY_QUERY, params)
+            for kind, product_id, lot_id, vehicle_id, location_id, warehouse_id, vehicle_state in self.env.cr.fetchall():
+                line_vals.append({
+                    'reconciliation_id': self.id,
+                    'discrepancy_type': kind,
+                    'product_id': product_id,
+                    'lot_id': lot_id,
+                    'vehicle_id': vehicle_id,
+                    'location_id': location_id,
+                    'warehouse_id': warehouse_id,
+                    'vehicle_state': vehicle_state,
+                })
+            self.env.cr.execute(QUANTITY_DISCREPANCY_QUERY, params)
+            for vehicle_id, product_id, recorded, expected in self.env.cr.fetchall():
+                line_vals.append({
+                    'reconciliation_id': self.id,
+                    'discrepancy_type': 'quantity_mismatch',
+                    'product_id': product_id,
+                    'vehicle_id': vehicle_id,
+                    'recorded_quantity': recorded,
+                    'expected_quantity': expected,
+                })
+        lines = self.env['dealership.reconciliation.line'].create(line_vals)
+        if self.auto_correct:
+            lines._correct()
+
+        if product_ids is None:
+            product_count = self.env['product.product'].with_context(active_test=False).search_count(
+                [('is_vehicle', '=', True)])
+        else:
+            product_count = len(product_ids)
+        self.write({
+            'state': 'done',
+            'date': fields.Datetime.now(),
+            'from_move_id': from_move_id,
+            'to_move_id': to_move_id,
+            'product_count': product_count,
+        })
+        # Full runs cover every move too, both kinds move the cursor
+        self.env['ir.config_parameter'].sudo().set_param(MOVE_CURSOR_PARAM, to_move_id)
+        _logger.info("Stock reconciliation %s: %s discrepancies (%s mode, moves %s-%s)",
+                     self.name, len(lines), self.mode, from_move_id, to_move_id)
+        return lines
+
+    @api.model
+    def _cron_reconcile(self, auto_correct=False):
+        reconciliation = self.create({'mode': 'incremental', 'auto_correct': auto_correct})
+        reconciliation._run()
+        if not reconciliation.line_ids:
+            # Keep the history readable: only runs that found something stay
+            reconciliation.unlink()
+
+
+class DealershipReconciliationLine(models.Model):
+    _name = 'dealership.reconciliation.line'
+    _description = 'Dealership Stock Reconciliation Line'
+    _order = 'discrepancy_type, product_id, id'
+
+    reconciliation_id = fields.Many2one(
+        'dealership.reconciliation', required=True, ondelete='cascade', index=True)
+    discrepancy_type = fields.Selection([
+        ('missing_vehicle', 'On Hand without Vehicle'),
+        ('not_on_hand', 'Available but not On Hand'),
+        ('state_mismatch', 'On Hand but not Available'),
+        ('branch_mismatch', 'Wrong Branch'),
+        ('quantity_mismatch', 'Wrong Quantity'),
+    ], string='Discrepancy', required=True)
+    product_id = fields.Many2one('product.product', string='Product')
+    lot_id = fields.Many2one('stock.lot', string='VIN/Serial')
+    vehicle_id = fields.Many2one('dealership.vehicle', string='Vehicle', ondelete='set null')
+    vehicle_state = fields.Selection(
+        selection=lambda self: self.env['dealership.vehicle']._fields['state'].selection,
+        string='Vehicle Status', help="Status of the vehicle when the discrepancy was found.")
+    location_id = fields.Many2one('stock.location', string='Location')
+    warehouse_id = fields.Many2one('stock.warehouse', string='Branch On Hand')
+    recorded_quantity = fields.Integer('Recorded Quantity')
+    expected_quantity = fields.Integer('Quantity On Hand')
+    corrected = fields.Boolean('Corrected', readonly=True)
+    note = fields.Char('Note')
+
+    def _get_delivered_lot_ids(self):
+        """Lots whose last done move went to a customer"""
+        lot_ids = self.lot_id.ids
+        if not lot_ids:
+            return set()
+        self.env.cr.execute("""
+            SELECT lot_id FROM (
+                SELECT DISTINCT ON (ml.lot_id) ml.lot_id, loc.usage
+                  FROM stock_move_line ml
+                  JOIN stock_location loc ON loc.id = ml.location_dest_id
+                 WHERE ml.state = 'done' AND ml.lot_id = ANY(%s)
+                 ORDER BY ml.lot_id, ml.date DESC, ml.id DESC
+            ) last_move
+             WHERE usage = 'customer'
+        """, (lot_ids,))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def _prepare_vehicle_vals(self):
+        self.ensure_one()
+        product = self.product_id
+        return {
+            'product_id': product.id,
+            'name': product.name,
+            'vin_number': self.lot_id.name,
+            'is_template_dummy': False,
+            'state': 'available',
+            'make_id': product.make_id.id,
+            'model_id': product.model_id.id,
+            'year': product.year,
+            'quantity': 1,
+            'branch_id': self.warehouse_id.id,
+            'purchase_price': product.standard_price,
+            'selling_price': product.list_price,
+        }
+
+    def _correct(self):
+        """Apply the corrections stock data determines without doubt.
+
+        Vehicles are written in groups of identical values; lines that
+        cannot be decided (e.g. an available vehicle whose serial never
+        left through a delivery) are only annotated.
+        """
+        Vehicle = self.env['dealership.vehicle']
+        by_type = {kind: self.filtered(lambda line, kind=kind: line.discrepancy_type == kind)
+                   for kind, _label in self._fields['discrepancy_type'].selection}
+        corrected = self.browse()
+
+        for line in by_type['missing_vehicle']:
+            product = line.product_id
+            if not (product.make_id and product.model_id and product.year):
+                line.note = _('Product has no make, model or year')
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    line.vehicle_id = Vehicle.create(line._prepare_vehicle_vals())
+                corrected |= line
+            except ValidationError as error:
+                line.note = error.args[0].splitlines()[0]
+
+        not_on_hand = by_type['not_on_hand']
+        delivered_lot_ids = not_on_hand._get_delivered_lot_ids()
+        delivered = not_on_hand.filtered(lambda line: line.lot_id.id in delivered_lot_ids)
+        if delivered:
+            delivered.vehicle_id.write({'state': 'sold', 'sold_date': fields.Date.context_today(self)})
+            corrected |= delivered
+        (not_on_hand - delivered).note = _('Serial never delivered, check the vehicle manually')
+
+        # Returned or never marked available: back in stock where it stands
+        for warehouse, lines in by_type['state_mismatch'].grouped('warehouse_id').items():
+            lines.vehicle_id.write({'state': 'available', 'sold_date': False, 'branch_id': warehouse.id})
+            corrected |= lines
+
+        for warehouse, lines in by_type['branch_mismatch'].grouped('warehouse_id').items():
+            lines.vehicle_id.write({'branch_id': warehouse.id})
+            corrected |= lines
+
+        for quantity, lines in by_type['quantity_mismatch'].grouped('expected_quantity').items():
+            lines.vehicle_id.write({'quantity': quantity})
+            corrected |= lines
+
+        corrected.corrected = True
+        return corrected
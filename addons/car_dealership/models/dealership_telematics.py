@@ -0,0 +1,215 @@
+from odoo import models, fields, api
+from ..tools import vin as vin_tools
+import csv
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+DIRECTORY_PARAM = 'car_dealership.telematics_directory'
+READING_BATCH_SIZE = 10000
+KM_PER_MILE = 1.609344
+
+# Matches VINs to the dealership vehicle and its fleet vehicle, falling back
+# on fleet vehicles registered with that VIN but without dealership record
+VEHICLE_LOOKUP_QUERY = """
+    WITH vins AS (SELECT DISTINCT unnest(%s::varchar[]) AS vin)
+    SELECT vins.vin, dv.id, fv.id, fv.odometer_unit
+      FROM vins
+      LEFT JOIN dealership_vehicle dv
+             ON dv.vin_number = vins.vin AND NOT COALESCE(dv.is_template_dummy, false)
+      LEFT JOIN LATERAL (
+            SELECT id FROM fleet_vehicle WHERE vin_sn = vins.vin ORDER BY id LIMIT 1
+           ) by_vin ON dv.fleet_vehicle_id IS NULL
+      LEFT JOIN fleet_vehicle fv ON fv.id = COALESCE(dv.fleet_vehicle_id, by_vin.id)
+     WHERE dv.id IS NOT NULL OR fv.id IS NOT NULL
+"""
+
+
+class DealershipTelematics(models.AbstractModel):
+    """Odometer readings dropped by telematics boxes as CSV or JSON lines files.
+
+    Files of the drop directory are streamed in batches of readings: each
+    batch resolves its VINs in one query, keeps the highest reading per
+    vehicle and day, skips days already recorded at that value or higher,
+    creates the fleet odometer rows in one create and moves the dealership
+    mileage forward with one UPDATE. Processed files are moved to
+    ``processed/``, unreadable ones to ``failed/``.
+    """
+    _name = 'dealership.telematics'
+    _description = 'Dealership Telematics Ingestion'
+
+    # ------------------------------------------------------------
+    # Reading files
+    # ------------------------------------------------------------
+
+    @api.model
+    def _parse_reading(self, record):
+        """(vin, kilometers, date) of a raw reading, ValueError when malformed"""
+        vin = vin_tools.normalize_vin(record.get('vin') or '')
+        if not vin:
+            raise ValueError('missing VIN')
+        value = float(record.get('odometer'))
+        if value < 0:
+            raise ValueError('negative odometer')
+        if (record.get('unit') or 'km').lower() in ('mi', 'mile', 'miles'):
+            value *= KM_PER_MILE
+        date = fields.Date.to_date(str(record.get('date') or '')[:10])
+        if not date:
+            raise ValueError('missing date')
+        return vin, value, date
+
+    @api.model
+    def _iter_readings(self, path, stats):
+        """Yield the parsed readings of a file, one line at a time"""
+        with open(path, newline='', encoding='utf-8') as reading_file:
+            jsonl = path.endswith('.jsonl')
+            records = (line for line in reading_file if line.strip()) if jsonl else csv.DictReader(reading_file)
+            for record in records:
+                try:
+                    yield self._parse_reading(json.loads(record) if jsonl else record)
+                except (AttributeError, TypeError, ValueError):
+                    stats['malformed'] += 1
+
+    # ------------------------------------------------------------
+    # Batches
+    # ------------------------------------------------------------
+
+    @api.model
+    def _lookup_vehicles(self, vins):
+        """{vin: (dealership vehicle id, fleet vehicle id, odometer unit)}"""
+        self.env.cr.execute(VEHICLE_LOOKUP_QUERY, (list(vins),))
+        return {vin: (vehicle_id, fleet_id, unit) for vin, vehicle_id, fleet_id, unit in self.env.cr.fetchall()}
+
+    @api.model
+    def _ingest_batch(self, readings, stats):
+        vehicles = self._lookup_vehicles({vin for vin, _value, _date in readings})
+
+        # Highest reading per vehicle and day
+        daily = {}
+        known = 0
+        for vin, value, date in readings:
+            if vin not in vehicles:
+                stats['unknown'] += 1
+                continue
+            known += 1
+            key = (vin, date)
+            if value > daily.get(key, -1.0):
+                daily[key] = value
+        stats['duplicates'] += known - len(daily)
+
+        fleet_readings = {}
+        mileage = {}
+        for (vin, date), value in daily.items():
+            vehicle_id, fleet_id, unit = vehicles[vin]
+            if vehicle_id and value > mileage.get(vehicle_id, -1.0):
+                mileage[vehicle_id] = value
+            if fleet_id:
+                fleet_value = value / KM_PER_MILE if unit == 'miles' else value
+                key = (fleet_id, date)
+                if fleet_value > fleet_readings.get(key, -1.0):
+                    fleet_readings[key] = fleet_value
+
+        if fleet_readings:
+            self.env['fleet.vehicle.odometer'].flush_model()
+            fleet_ids = list({fleet_id for fleet_id, _date in fleet_readings})
+            dates = [date for _fleet_id, date in fleet_readings]
+            self.env.cr.execute("""
+                SELECT vehicle_id, date, MAX(value) FROM fleet_vehicle_odometer
+                 WHERE vehicle_id = ANY(%s) AND date BETWEEN %s AND %s
+                 GROUP BY vehicle_id, date
+            """, (fleet_ids, min(dates), max(dates)))
+            recorded = {(fleet_id, date): value for fleet_id, date, value in self.env.cr.fetchall()}
+            vals_list = [
+                {'vehicle_id': fleet_id, 'date': date, 'value': value}
+                for (fleet_id, date), value in sorted(fleet_readings.items())
+                if value > recorded.get((fleet_id, date), -1.0)
+            ]
+            stats['skipped'] += len(fleet_readings) - len(vals_list)
+            if vals_list:
+                self.env['fleet.vehicle.odometer'].create(vals_list)
+                stats['odometers'] += len(vals_list)
+
+        if mileage:
+            self.env['dealership.vehicle'].flush_model(['mileage'])
+            self.env.cr.execute("""
+                UPDATE dealership_vehicle veh
+                   SET mileage = reading.value,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::float8[]) AS value) reading
+                 WHERE veh.id = reading.id
+                   AND COALESCE(veh.mileage, 0) < reading.value
+             RETURNING veh.id
+            """, (list(mileage), list(mileage.values())))
+            updated_ids = [row[0] for row in self.env.cr.fetchall()]
+            if updated_ids:
+                Vehicle = self.env['dealership.vehicle']
+                Vehicle.browse(updated_ids).invalidate_recordset(['mileage', 'write_date'])
+                Vehicle._refresh_analytics_fields(updated_ids)
+                stats['mileages'] += len(updated_ids)
+
+    # ------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------
+
+    @api.model
+    def _ingest_file(self, path, batch_size=READING_BATCH_SIZE):
+        stats = dict.fromkeys(
+            ['readings', 'malformed', 'unknown', 'duplicates', 'skipped', 'odometers', 'mileages'], 0)
+        readings = self._iter_readings(path, stats)
+        while True:
+            batch = list(itertools.islice(readings, batch_size))
+            if not batch:
+                break
+            stats['readings'] += len(batch)
+            self._ingest_batch(batch, stats)
+        return stats
+
+    @api.model
+    def _move_file(self, path, subdirectory):
+        target_directory = os.path.join(os.path.dirname(path), subdirectory)
+        os.makedirs(target_directory, exist_ok=True)
+        os.replace(path, os.path.join(target_directory, os.path.basename(path)))
+
+    @api.model
+    def _cron_ingest_readings(self, batch_size=READING_BATCH_SIZE, time_budget=None, auto_commit=None):
+        """Ingest the reading files of the drop directory, oldest name first"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        directory = ICP.get_param(DIRECTORY_PARAM)
+        if not directory or not os.path.isdir(directory):
+            return 0
+        if time_budget is None:
+            time_budget = int(ICP.get_param('car_dealership.telematics_time_budget', 240))
+        if auto_commit is None:
+            auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        deadline = time.monotonic() + time_budget
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith(('.csv', '.jsonl')) and os.path.isfile(os.path.join(directory, name))
+        )
+        done = 0
+        for path in paths:
+            try:
+                with self.env.cr.savepoint():
+                    stats = self._ingest_file(path, batch_size=batch_size)
+            except (OSError, UnicodeDecodeError, csv.Error) as error:
+                _logger.warning("Telematics file %s could not be read: %s", path, error)
+                self._move_file(path, 'failed')
+                continue
+            if auto_commit:
+                self.env.cr.commit()
+            # Only moved once its readings are committed
+            self._move_file(path, 'processed')
+            done += 1
+            _logger.info("Telematics file %s: %s", os.path.basename(path), stats)
+            if time.monotonic() >= deadline:
+                remaining = len(paths) - done
+                self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+                return done
+        self.env['ir.cron']._notify_progress(done=done, remaining=0)
+        return done
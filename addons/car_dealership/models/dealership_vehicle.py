@@ -1,9 +1,68 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, Command, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import column_exists, create_column, table_exists
+from markupsafe import Markup
+from ..tools.vehicle_similarity import VehicleSimilarityIndex
+from ..tools import vehicle_facets
+from ..tools import vin as vin_tools
+from ..tools.replica import call_on_replica
+import hashlib
+import json
 import logging
+import threading
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Documents keeping a product alive: such products are archived, not deleted
+PRODUCT_REFERENCE_TABLES = [
+    'stock_move', 'stock_move_line', 'stock_quant', 'stock_lot',
+    'sale_order_line', 'purchase_order_line', 'account_move_line',
+]
+# Unlinked gallery uploads younger than this may belong to an unsaved form
+ORPHAN_ATTACHMENT_GRACE_HOURS = 24
+SIMILAR_VEHICLE_LIMIT = 10
+
+# Branch of the vehicles without one: warehouse holding their VIN lot, else
+# warehouse of the last internal location the lot was moved to
+BRANCH_FROM_STOCK_QUERY = """
+    WITH located AS (
+        SELECT DISTINCT ON (veh.id) veh.id AS vehicle_id, loc.warehouse_id
+          FROM dealership_vehicle veh
+          JOIN stock_lot lot ON lot.name = veh.vin_number
+          JOIN (
+                SELECT lot_id, location_id, 0 AS priority, NULL::timestamp AS date
+                  FROM stock_quant
+                 WHERE quantity > 0
+                 UNION ALL
+                SELECT lot_id, location_dest_id, 1, date
+                  FROM stock_move_line
+                 WHERE state = 'done' AND lot_id IS NOT NULL
+               ) seen ON seen.lot_id = lot.id
+          JOIN stock_location loc ON loc.id = seen.location_id
+         WHERE veh.branch_id IS NULL
+           AND loc.usage = 'internal'
+           AND loc.warehouse_id IS NOT NULL
+         ORDER BY veh.id, seen.priority, seen.date DESC NULLS LAST
+    )
+    UPDATE dealership_vehicle veh
+       SET branch_id = located.warehouse_id
+      FROM located
+     WHERE veh.id = located.vehicle_id
+"""
+# Companies with a single warehouse: it is the branch of all their vehicles
+BRANCH_FROM_COMPANY_QUERY = """
+    UPDATE dealership_vehicle veh
+       SET branch_id = warehouse.id
+      FROM (SELECT company_id, min(id) AS id
+              FROM stock_warehouse
+             WHERE active
+             GROUP BY company_id
+            HAVING count(*) = 1) warehouse
+     WHERE veh.branch_id IS NULL
+       AND veh.company_id = warehouse.company_id
+"""
+
 
 class DealershipVehicle(models.Model):
     """Extended vehicle model for dealership operations"""
@@ -28,6 +87,10 @@ class DealershipVehicle(models.Model):
     product_template_id = fields.Many2one(
         'product.template', string='Product Template', ondelete='cascade')
 
+    to_purge = fields.Boolean(
+        'Scheduled for Purge', copy=False, readonly=True,
+        help="Deleted in the background by the purge scheduled action.")
+
     # Vehicle Details
     make_id = fields.Many2one(
         'fleet.vehicle.model.brand', string='Make', required=True, tracking=True)
@@ -67,6 +130,21 @@ class DealershipVehicle(models.Model):
         'Selling Price', currency_field='currency_id', tracking=True)
     currency_id = fields.Many2one('res.currency', string='Currency',
                                   default=lambda self: self.env.company.currency_id)
+    company_id = fields.Many2one('res.company', string='Company', index=True,
+                                 default=lambda self: self.env.company)
+    company_currency_id = fields.Many2one(
+        related='company_id.currency_id', string='Company Currency')
+    purchase_price_company = fields.Monetary(
+        'Cost Price (Company Currency)', currency_field='company_currency_id',
+        compute='_compute_company_amounts', store=True,
+        help="Cost converted at the rate of the receipt date.")
+    selling_price_company = fields.Monetary(
+        'Selling Price (Company Currency)', currency_field='company_currency_id',
+        compute='_compute_company_amounts', store=True,
+        help="Selling price converted at the rate of the sale date, or the latest rate if unsold.")
+    margin_company = fields.Monetary(
+        'Margin (Company Currency)', currency_field='company_currency_id',
+        compute='_compute_company_amounts', store=True, index=True)
     sale_order_line_id = fields.Many2one(
         'sale.order.line', string='Sale Order Line')
 
@@ -77,9 +155,28 @@ class DealershipVehicle(models.Model):
         ('sold', 'Sold'),
     ], string='Status', default='draft', tracking=True)
 
+    branch_id = fields.Many2one(
+        'stock.warehouse', string='Branch', index=True, tracking=True,
+        default=lambda self: self.env.user._get_default_dealership_branch(),
+        help="Showroom holding the vehicle, derived from the receiving location.")
+
     # Relations
+    business_type = fields.Selection([
+        ('owner', "Owner's Product"),
+        ('dealer_network', 'Dealer Network'),
+        ('consigned', 'Consigned'),
+    ], string='Business Type', default='owner', required=True, tracking=True,
+        help="Dealer network and consigned vehicles are sold on commission and "
+             "settled with their vendor once sold.")
     vendor_id = fields.Many2one('res.partner', string='Vendor/Consignor',
                                 help="Dealer or consignor for non-owner products")
+    commission_type = fields.Selection([
+        ('percentage', 'Percentage'),
+        ('fixed', 'Fixed Amount'),
+    ], string='Commission Type', default='percentage', tracking=True)
+    commission_value = fields.Float(
+        'Commission', tracking=True,
+        help="Percentage of the selling price or fixed amount kept by the dealership.")
     purchase_order_line_id = fields.Many2one(
         'purchase.order.line', string='Purchase Order Line')
 
@@ -111,6 +208,34 @@ class DealershipVehicle(models.Model):
                               help="Number of vehicles of this make/model/year/color in stock.")
     trim = fields.Char('Trim', tracking=True,)
 
+    # Analytics
+    receipt_date = fields.Date('Receipt Date', copy=False,
+                               help="Date the vehicle was received into stock.")
+    sold_date = fields.Date('Sold Date', copy=False)
+    margin = fields.Monetary(
+        'Margin', currency_field='currency_id', compute='_compute_margin',
+        store=True, index=True)
+    age_years = fields.Integer(
+        'Age (years)', compute='_compute_age_years', store=True, index=True)
+    days_in_stock = fields.Integer(
+        'Days in Stock', compute='_compute_days_in_stock', store=True, index=True,
+        help="Days between receipt (or creation) and sale, or today if unsold.")
+    price_per_km = fields.Float(
+        'Price per km', compute='_compute_price_per_km', store=True, index=True)
+
+    similar_vehicle_count = fields.Integer(
+        'Similar Vehicles', compute='_compute_similar_vehicle_count')
+
+    # Maintenance
+    maintenance_interval = fields.Integer(
+        'Maintenance Interval (months)', default=6,
+        help="Months between two maintenance reminders.")
+    next_maintenance_date = fields.Date(
+        'Next Maintenance', index=True, tracking=True,
+        help="Date on which the next maintenance reminder is due.")
+    last_maintenance_reminder = fields.Datetime(
+        'Last Maintenance Reminder', readonly=True, copy=False)
+
     @api.model
     def create_product_variant(self):
         # Create specific product variant when vehicle becomes available
@@ -120,8 +245,67 @@ class DealershipVehicle(models.Model):
         })
         self.product_variant_id = variant.id
 
+    @api.model
+    def _validate_vins(self, values):
+        """Validate a batch of VINs at once, raise one error listing all bad ones"""
+        infos = vin_tools.validate_vins(values)
+        errors = ['- %s: %s' % (info.vin or _('(empty)'), vin_tools.ERROR_MESSAGES[info.error])
+                  for info in infos if info.error]
+        if errors:
+            raise ValidationError(_('Invalid VIN/Chassis Number:\n%s', '\n'.join(errors)))
+        return infos
+
+    @api.model
+    def _prepare_vin_vals(self, vals_list):
+        """Normalize VINs and fill make and year from them when missing"""
+        to_decode = []
+        for vals in vals_list:
+            if vals.get('vin_number'):
+                vals['vin_number'] = vin_tools.normalize_vin(vals['vin_number'])
+                if not vals.get('make_id') or not vals.get('year'):
+                    to_decode.append(vals)
+        if not to_decode:
+            return vals_list
+        infos = vin_tools.validate_vins([vals['vin_number'] for vals in to_decode])
+        brand_ids = {name.lower(): brand_id for brand_id, name in self._get_vehicle_catalog()['b']}
+        for vals, info in zip(to_decode, infos):
+            if info.error:
+                continue
+            if not vals.get('make_id') and info.manufacturer:
+                brand_id = brand_ids.get(info.manufacturer.lower())
+                if brand_id:
+                    vals['make_id'] = brand_id
+            if not vals.get('year') and info.model_year:
+                vals['year'] = info.model_year
+        return vals_list
+
+    @api.model
+    def load(self, fields, data):
+        """Check the VIN column of a whole import file in one pass"""
+        if 'vin_number' in fields:
+            column = fields.index('vin_number')
+            infos = vin_tools.validate_vins([row[column] for row in data])
+            messages = []
+            for row_index, (row, info) in enumerate(zip(data, infos)):
+                if not row[column]:
+                    continue
+                if info.error:
+                    messages.append({
+                        'type': 'error',
+                        'record': row_index,
+                        'field': 'vin_number',
+                        'message': _('Invalid VIN %(vin)s: %(reason)s',
+                                     vin=info.vin, reason=vin_tools.ERROR_MESSAGES[info.error]),
+                    })
+                else:
+                    row[column] = info.vin
+            if messages:
+                return {'ids': False, 'messages': messages, 'nextrow': 0}
+        return super().load(fields, data)
+
     @api.model_create_multi
     def create(self, vals_list):
+        self._prepare_vin_vals(vals_list)
         new_vehicles = self.env['dealership.vehicle']
         for vals in vals_list:
             # Always create individual records when called from stock picking with VIN
@@ -176,39 +360,448 @@ class DealershipVehicle(models.Model):
             self.message_post(body=_('Product created: %s') %
                               product_template.name)
 
-    @api.onchange('make_id')
-    def _onchange_make_id(self):
-        """Clear model when make changes"""
-        if self.make_id:
-            # Clear the model field and set domain
-            self.model_id = False
-            return {'domain': {'model_id': [('brand_id', '=', self.make_id.id)]}}
-        else:
-            # If no make selected, clear model and show no models
-            self.model_id = False
-            return {'domain': {'model_id': [('id', '=', False)]}}
-
-    @api.onchange('model_id', 'year', 'trim')
-    def _onchange_vehicle_details(self):
-        if self.model_id:
-            name_parts = [self.model_id.brand_id.name, self.model_id.name]
-            if self.year:
-                name_parts.append(str(self.year))
-            if self.trim:
-                name_parts.append(str(self.trim))
-            self.name = ' '.join(name_parts)
+    def init(self):
+        # Feeds and pollers read "what changed since" on write_date
+        tools.create_index(self.env.cr, 'dealership_vehicle_write_date_index',
+                           self._table, ['write_date'])
+        tools.create_index(self.env.cr, 'dealership_vehicle_available_write_date_index',
+                           self._table, ['write_date'], where="state = 'available'")
+        # Record rules partition every search by branch, usually with a state filter
+        tools.create_index(self.env.cr, 'dealership_vehicle_branch_id_state_index',
+                           self._table, ['branch_id', 'state'])
+        tools.create_index(self.env.cr, 'dealership_vehicle_to_purge_index',
+                           self._table, ['id'], where="to_purge")
+
+    def _get_image_checksums(self):
+        """Checksums of the main image and gallery attachments of these vehicles.
+
+        Returns ({vehicle_id: checksum}, {vehicle_id: [(attachment_id, checksum)]}),
+        used to build stable, cache-friendly image URLs.
+        """
+        vehicle_ids = self.ids
+        self.env.cr.execute("""
+            SELECT res_id, checksum
+              FROM ir_attachment
+             WHERE res_model = 'dealership.vehicle'
+               AND res_field = 'image_1920'
+               AND res_id = ANY(%s)
+        """, (vehicle_ids,))
+        main_images = dict(self.env.cr.fetchall())
+        self.env.cr.execute("""
+            SELECT rel.dealership_vehicle_id, att.id, att.checksum
+              FROM dealership_vehicle_image_rel rel
+              JOIN ir_attachment att ON att.id = rel.attachment_id
+             WHERE rel.dealership_vehicle_id = ANY(%s)
+             ORDER BY att.id
+        """, (vehicle_ids,))
+        gallery = {}
+        for vehicle_id, attachment_id, checksum in self.env.cr.fetchall():
+            gallery.setdefault(vehicle_id, []).append((attachment_id, checksum))
+        return main_images, gallery
+
+    @api.model
+    def _get_available_inventory_signature(self):
+        """Cheap probe of the available inventory: (max write_date, count)"""
+        self.env.cr.execute("""
+            SELECT max(write_date), count(*)
+              FROM dealership_vehicle
+             WHERE state = 'available'
+               AND NOT COALESCE(is_template_dummy, false)
+        """)
+        return self.env.cr.fetchone()
+
+    _ANALYTICS_COLUMNS = [
+        ('margin', 'numeric'),
+        ('age_years', 'int4'),
+        ('days_in_stock', 'int4'),
+        ('price_per_km', 'float8'),
+    ]
+
+    _COMPANY_AMOUNT_COLUMNS = [
+        ('purchase_price_company', 'numeric'),
+        ('selling_price_company', 'numeric'),
+        ('margin_company', 'numeric'),
+    ]
+
+    def _auto_init(self):
+        """Create the analytics and company amount columns upfront so the
+        ORM does not compute them record by record on upgrade; they are
+        filled with set-based UPDATEs instead. On a fresh install the table
+        does not exist yet and the ORM creates everything itself.
+        """
+        missing = missing_amounts = []
+        if table_exists(self.env.cr, self._table):
+            missing = [
+                (column, column_type) for column, column_type in self._ANALYTICS_COLUMNS
+                if not column_exists(self.env.cr, self._table, column)
+            ]
+            missing_amounts = [
+                (column, column_type) for column, column_type in self._COMPANY_AMOUNT_COLUMNS
+                if not column_exists(self.env.cr, self._table, column)
+            ]
+        for column, column_type in missing + missing_amounts:
+            create_column(self.env.cr, self._table, column, column_type)
+        result = super()._auto_init()
+        if missing:
+            self._refresh_analytics_fields()
+        if missing_amounts:
+            self._refresh_company_amounts()
+        return result
+
+    @api.depends('selling_price', 'purchase_price')
+    def _compute_margin(self):
+        for vehicle in self:
+            vehicle.margin = (vehicle.selling_price or 0.0) - (vehicle.purchase_price or 0.0)
+
+    @api.depends('year')
+    def _compute_age_years(self):
+        current_year = fields.Date.context_today(self).year
+        for vehicle in self:
+            vehicle.age_years = max(current_year - vehicle.year, 0) if vehicle.year else 0
+
+    @api.depends('receipt_date', 'create_date', 'sold_date')
+    def _compute_days_in_stock(self):
+        today = fields.Date.context_today(self)
+        for vehicle in self:
+            start = vehicle.receipt_date or (vehicle.create_date and vehicle.create_date.date()) or today
+            end = vehicle.sold_date or today
+            vehicle.days_in_stock = max((end - start).days, 0)
+
+    @api.depends('selling_price', 'mileage')
+    def _compute_price_per_km(self):
+        for vehicle in self:
+            vehicle.price_per_km = (vehicle.selling_price or 0.0) / vehicle.mileage if vehicle.mileage else 0.0
+
+    @api.model
+    def _refresh_analytics_fields(self, ids=None):
+        """Recompute the stored analytics fields set-based in SQL.
+
+        Used to backfill existing rows and by the daily cron, since age and
+        days in stock move with the calendar rather than with a write.
+        """
+        query = """
+            UPDATE dealership_vehicle
+               SET margin = COALESCE(selling_price, 0) - COALESCE(purchase_price, 0),
+                   age_years = CASE WHEN year > 0
+                                    THEN GREATEST(EXTRACT(YEAR FROM %(today)s::date)::int - year, 0)
+                                    ELSE 0 END,
+                   days_in_stock = GREATEST(
+                       COALESCE(sold_date, %(today)s::date)
+                       - COALESCE(receipt_date, create_date::date, %(today)s::date), 0),
+                   price_per_km = CASE WHEN mileage > 0
+                                       THEN COALESCE(selling_price, 0) / mileage
+                                       ELSE 0 END
+        """
+        params = {'today': fields.Date.context_today(self)}
+        if ids is not None:
+            if not ids:
+                return
+            query += " WHERE id IN %(ids)s"
+            params['ids'] = tuple(ids)
+        self.env.cr.execute(query, params)
+        _logger.info("Refreshed dealership analytics on %s vehicles", self.env.cr.rowcount)
+        self.invalidate_model(['margin', 'age_years', 'days_in_stock', 'price_per_km'])
+
+    @api.depends('purchase_price', 'selling_price', 'currency_id', 'company_id',
+                 'receipt_date', 'create_date', 'sold_date')
+    def _compute_company_amounts(self):
+        today = fields.Date.context_today(self)
+        Currency = self.env['res.currency']
+        # Vehicles of a batch mostly share their currency, company and dates
+        rates = {}
+
+        def rate_at(currency, company, date):
+            key = (currency.id, company.id, date)
+            if key not in rates:
+                rates[key] = Currency._get_dealership_conversion_rate(*key)
+            return rates[key]
+
+        for vehicle in self:
+            company = vehicle.company_id or self.env.company
+            currency = vehicle.currency_id or company.currency_id
+            purchase_date = vehicle.receipt_date or (vehicle.create_date and vehicle.create_date.date()) or today
+            purchase_rate = rate_at(currency, company, purchase_date)
+            sale_rate = rate_at(currency, company, vehicle.sold_date or today)
+            vehicle.purchase_price_company = (vehicle.purchase_price or 0.0) * purchase_rate
+            vehicle.selling_price_company = (vehicle.selling_price or 0.0) * sale_rate
+            vehicle.margin_company = vehicle.selling_price_company - vehicle.purchase_price_company
+
+    @api.model
+    def _backfill_branches(self):
+        """Assign a branch to the vehicles created before branches existed.
+
+        Run on every module update; only vehicles without branch are touched.
+        """
+        self.flush_model(['branch_id', 'vin_number', 'company_id'])
+        self.env.cr.execute(BRANCH_FROM_STOCK_QUERY)
+        from_stock = self.env.cr.rowcount
+        self.env.cr.execute(BRANCH_FROM_COMPANY_QUERY)
+        _logger.info("Assigned a branch to %s dealership vehicles from stock, %s from their company",
+                     from_stock, self.env.cr.rowcount)
+        self.invalidate_model(['branch_id'])
+
+    @api.model
+    def _refresh_company_amounts(self, ids=None, currency_ids=None):
+        """Recompute the stored company currency amounts set-based in SQL.
+
+        Rates are resolved like res.currency._get_rates: the latest rate not
+        after the date, company specific rates first, 1.0 when none exists.
+        """
+        where = ["TRUE"]
+        params = {'today': fields.Date.context_today(self), 'company_id': self.env.company.id}
+        if ids is not None:
+            if not ids:
+                return
+            where.append("veh.id IN %(ids)s")
+            params['ids'] = tuple(ids)
+        if currency_ids is not None:
+            if not currency_ids:
+                return
+            # A company currency rate change affects every foreign amount
+            where.append("(veh.currency_id IN %(currency_ids)s OR comp.currency_id IN %(currency_ids)s)")
+            params['currency_ids'] = tuple(currency_ids)
+        rate_query = """
+            COALESCE((SELECT r.rate FROM res_currency_rate r
+                       WHERE r.currency_id = {currency}
+                         AND r.name <= {date}
+                         AND (r.company_id = comp.id OR r.company_id IS NULL)
+                       ORDER BY r.company_id, r.name DESC
+                       LIMIT 1), 1.0)
+        """
+        factor = """
+            CASE WHEN COALESCE(veh.currency_id, comp.currency_id) = comp.currency_id THEN 1.0
+                 ELSE {company_rate} / NULLIF({vehicle_rate}, 0) END
+        """
+
+        def factor_at(date):
+            return factor.format(
+                company_rate=rate_query.format(currency='comp.currency_id', date=date),
+                vehicle_rate=rate_query.format(currency='veh.currency_id', date=date))
+
+        # The fragments carry query parameters: assemble with format, not %
+        self.env.cr.execute("""
+            UPDATE dealership_vehicle v
+               SET purchase_price_company = COALESCE(v.purchase_price, 0) * rates.purchase_factor,
+                   selling_price_company = COALESCE(v.selling_price, 0) * rates.sale_factor,
+                   margin_company = COALESCE(v.selling_price, 0) * rates.sale_factor
+                                    - COALESCE(v.purchase_price, 0) * rates.purchase_factor
+              FROM (
+                   SELECT veh.id,
+                          COALESCE({purchase_factor}, 1.0) AS purchase_factor,
+                          COALESCE({sale_factor}, 1.0) AS sale_factor
+                     FROM dealership_vehicle veh
+                     JOIN res_company comp ON comp.id = COALESCE(veh.company_id, %(company_id)s)
+                    WHERE {where}
+                   ) rates
+             WHERE v.id = rates.id
+        """.format(
+            purchase_factor=factor_at("COALESCE(veh.receipt_date, veh.create_date::date, %(today)s::date)"),
+            sale_factor=factor_at("COALESCE(veh.sold_date, %(today)s::date)"),
+            where=" AND ".join(where),
+        ), params)
+        _logger.info("Refreshed company currency amounts on %s vehicles", self.env.cr.rowcount)
+        self.invalidate_model(['purchase_price_company', 'selling_price_company', 'margin_company'])
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        # Analysis views (graph, pivot) set this key to aggregate on the replica
+        if not self.env.context.get('dealership_read_replica'):
+            return super().read_group(domain, fields, groupby, offset=offset, limit=limit,
+                                      orderby=orderby, lazy=lazy)
+        return call_on_replica(self.env, lambda env: super(DealershipVehicle, self.with_env(env)).read_group(
+            domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy))
+
+    @api.model
+    def get_valuation_totals(self, domain=None):
+        """Company currency totals of the vehicles matching ``domain``, read on the replica"""
+        [(count, purchase, selling, margin)] = call_on_replica(self.env, lambda env: env[self._name]._read_group(
+            domain or [], [],
+            ['__count', 'purchase_price_company:sum', 'selling_price_company:sum', 'margin_company:sum']))
+        return {
+            'count': count,
+            'currency_id': self.env.company.currency_id.id,
+            'purchase_price': purchase or 0.0,
+            'selling_price': selling or 0.0,
+            'margin': margin or 0.0,
+        }
+
+    @api.model
+    def _cron_refresh_analytics(self):
+        # Sold vehicles keep a fixed days in stock, only their age can move
+        self.env.cr.execute("""
+            SELECT id FROM dealership_vehicle
+             WHERE sold_date IS NULL
+                OR age_years IS DISTINCT FROM CASE WHEN year > 0
+                                                   THEN GREATEST(EXTRACT(YEAR FROM %s::date)::int - year, 0)
+                                                   ELSE 0 END
+        """, (fields.Date.context_today(self),))
+        self._refresh_analytics_fields([row[0] for row in self.env.cr.fetchall()])
+
+    def _get_similarity_features(self):
+        self.ensure_one()
+        numeric = (self.year or 0, self.mileage or 0.0, self.selling_price or 0.0)
+        categories = (self.fleet_category_id.id, self.fuel_type, self.transmission,
+                      self.condition, self.make_id.id, self.model_id.id)
+        return numeric, categories
+
+    def _find_similar_ids(self, index, limit):
+        """{vehicle: [(id, distance)]} of the closest vehicles the user can read"""
+        # Ask for more than needed: record rules may hide some of them
+        candidates = {
+            vehicle: index.nearest(*vehicle._get_similarity_features(), limit * 2, exclude_id=vehicle.id)
+            for vehicle in self
+        }
+        candidate_ids = {vehicle_id for matches in candidates.values() for vehicle_id, _distance in matches}
+        visible = set(self.search([('id', 'in', list(candidate_ids))]).ids)
+        return {
+            vehicle: [match for match in matches if match[0] in visible][:limit]
+            for vehicle, matches in candidates.items()
+        }
+
+    def get_similar_vehicles(self, limit=SIMILAR_VEHICLE_LIMIT):
+        """Closest available vehicles to this one (RPC friendly).
+
+        Distances are computed over the in-memory feature matrix of the
+        available inventory; results are filtered by the user's access.
+        """
+        self.ensure_one()
+        index = VehicleSimilarityIndex.for_env(self.env)
+        matches = self._find_similar_ids(index, limit)[self]
+        distances = dict(matches)
+        return [{
+            'id': vehicle.id,
+            'name': vehicle.name,
+            'vin_number': vehicle.vin_number,
+            'year': vehicle.year,
+            'mileage': vehicle.mileage,
+            'selling_price': vehicle.selling_price,
+            'distance': distances[vehicle.id],
+        } for vehicle in self.browse([vehicle_id for vehicle_id, _distance in matches])]
+
+    @api.depends('year', 'mileage', 'selling_price', 'fleet_category_id', 'fuel_type',
+                 'transmission', 'condition', 'make_id', 'model_id')
+    def _compute_similar_vehicle_count(self):
+        """One index sync and one access check for the whole batch"""
+        vehicles = self.filtered(lambda vehicle: vehicle.id and not vehicle.is_template_dummy)
+        (self - vehicles).similar_vehicle_count = 0
+        if not vehicles:
+            return
+        index = VehicleSimilarityIndex.for_env(self.env)
+        for vehicle, matches in vehicles._find_similar_ids(index, SIMILAR_VEHICLE_LIMIT).items():
+            vehicle.similar_vehicle_count = len(matches)
+
+    def action_view_similar_vehicles(self):
+        self.ensure_one()
+        similar_ids = [match['id'] for match in self.get_similar_vehicles()]
+        return {
+            'name': _('Similar to %s', self.name),
+            'type': 'ir.actions.act_window',
+            'res_model': 'dealership.vehicle',
+            'view_mode': 'list,kanban,form',
+            'domain': [('id', 'in', similar_ids)],
+        }
+
+    @api.model
+    def search_facets(self, filters=None, limit=80, offset=0):
+        """Available vehicles matching ``filters`` and the counts of every facet.
+
+        ``filters`` maps facets to lists of accepted values: record ids for
+        make_id, model_id and fleet_category_id, selection keys for
+        fuel_type, transmission and condition, band indexes for year_band
+        and price_band. Everything is answered from the in-memory facet
+        index in one call; ids are returned newest first.
+        """
+        index = vehicle_facets.VehicleFacetIndex.for_env(self.env)
+        branch_ids = None
+        user = self.env.user
+        if not self.env.su and user._is_internal() and not user.has_group(
+                'car_dealership.group_dealership_all_branches'):
+            # Same partition as the vehicle record rules
+            branch_ids = user.dealership_branch_ids.ids
+        ids, counts = index.search(filters or {}, branch_ids=branch_ids)
+        ids.sort(reverse=True)
+        return {
+            'count': len(ids),
+            'ids': ids[offset:offset + limit] if limit else ids[offset:],
+            'facets': self._format_facet_counts(counts),
+        }
+
+    @api.model
+    def _format_facet_counts(self, counts):
+        """[{'value', 'label', 'count'}] per facet, bands in order, others by count"""
+        labels = {}
+        for facet in vehicle_facets.ID_FACETS:
+            comodel = self.env[self._fields[facet].comodel_name].sudo()
+            # Codes of the snapshot may refer to records deleted since
+            records = comodel.browse(list(counts[facet])).exists()
+            labels[facet] = {record.id: record.display_name for record in records}
+        for facet in vehicle_facets.SELECTION_FACETS:
+            labels[facet] = dict(self._fields[facet]._description_selection(self.env))
+        labels['year_band'] = dict(enumerate(vehicle_facets.band_labels(vehicle_facets.YEAR_BANDS)))
+        labels['price_band'] = dict(enumerate(vehicle_facets.band_labels(vehicle_facets.PRICE_BANDS)))
+
+        result = {}
+        for facet in vehicle_facets.FACETS:
+            entries = [
+                {'value': value, 'label': labels[facet].get(value, value), 'count': count}
+                for value, count in counts[facet].items()
+            ]
+            if facet in vehicle_facets.BAND_FACETS:
+                entries.sort(key=lambda entry: entry['value'])
+            else:
+                entries.sort(key=lambda entry: (-entry['count'], str(entry['label'])))
+            result[facet] = entries
+        return result
+
+    @api.model
+    @tools.ormcache()
+    def _get_vehicle_catalog(self):
+        """Compact brand -> models -> categories map used by the vehicle form.
+
+        The form filters models and composes the vehicle name from this
+        catalog in the browser instead of calling onchanges on every edit.
+        Cached per registry and invalidated by the fleet catalog models.
+        """
+        env = self.sudo().env
+        brands = env['fleet.vehicle.model.brand'].search_read(
+            [], ['name'], order='name')
+        vehicle_models = env['fleet.vehicle.model'].search_read(
+            [], ['name', 'brand_id', 'category_id'], order='name')
+        categories = env['fleet.vehicle.model.category'].search_read(
+            [], ['name'], order='name')
+        catalog = {
+            'b': [[brand['id'], brand['name']] for brand in brands],
+            'm': [[model['id'], model['name'],
+                   model['brand_id'] and model['brand_id'][0],
+                   model['category_id'] and model['category_id'][0]]
+                  for model in vehicle_models],
+            'c': [[category['id'], category['name']] for category in categories],
+        }
+        payload = json.dumps(catalog, sort_keys=True, separators=(',', ':'))
+        catalog['v'] = hashlib.sha1(payload.encode()).hexdigest()[:16]
+        return catalog
+
+    @api.model
+    def get_vehicle_catalog(self, version=None):
+        """RPC entry point: return only the version when the caller is up to date"""
+        catalog = self._get_vehicle_catalog()
+        if version and version == catalog['v']:
+            return {'v': version}
+        return catalog
 
     @api.constrains('vin_number')
     def _check_vin_number(self):
-        for record in self:
-            if record.vin_number:
-                existing = self.search([
-                    ('vin_number', '=', record.vin_number),
-                    ('id', '!=', record.id)
-                ])
-                if existing:
-                    raise ValidationError(
-                        _('VIN Number must be unique. This VIN already exists.'))
+        vins = [vin for vin in self.mapped('vin_number') if vin]
+        if not vins:
+            return
+        self._validate_vins(vins)
+        duplicates = self._read_group(
+            [('vin_number', 'in', vins)], ['vin_number'], ['__count'],
+            having=[('__count', '>', 1)])
+        if duplicates:
+            raise ValidationError(
+                _('VIN Number must be unique. This VIN already exists: %s',
+                  ', '.join(vin for vin, _count in duplicates)))
 
     # Add 'state' to the constrains decorator
     @api.constrains('model_id', 'year', 'state')
@@ -255,14 +848,138 @@ class DealershipVehicle(models.Model):
                 body=_('Fleet vehicle record created: %s') % fleet_vehicle.name)
 
     def unlink(self):
-        """Override unlink to handle product deletion"""
-        products_to_delete = self.product_id
+        """Override unlink to remove the products of the vehicles as well.
+
+        Products still used by other vehicles are kept, products referenced
+        by stock, sale, purchase or accounting documents are archived.
+        """
+        deletable, archivable = self._classify_products_to_remove()
         result = super().unlink()
-        # Delete corresponding products if they exist
-        if products_to_delete:
-            products_to_delete.unlink()
+        self._remove_products(deletable, archivable)
         return result
 
+    def _classify_products_to_remove(self):
+        """Split the products of these vehicles into (deletable, archivable)"""
+        Product = self.env['product.product']
+        products = self.product_id
+        if not products:
+            return Product, Product
+        self.env.flush_all()
+        product_ids = tuple(products.ids)
+        self.env.cr.execute("""
+            SELECT DISTINCT product_id FROM dealership_vehicle
+             WHERE product_id IN %s AND id NOT IN %s
+        """, (product_ids, tuple(self.ids)))
+        shared = {row[0] for row in self.env.cr.fetchall()}
+        self.env.cr.execute(" UNION ".join(
+            "SELECT product_id FROM %s WHERE product_id IN %%(ids)s" % table
+            for table in PRODUCT_REFERENCE_TABLES
+        ), {'ids': product_ids})
+        referenced = {row[0] for row in self.env.cr.fetchall()} - shared
+        deletable = [pid for pid in product_ids if pid not in shared and pid not in referenced]
+        return Product.browse(deletable), Product.browse(sorted(referenced))
+
+    @api.model
+    def _remove_products(self, deletable, archivable):
+        if deletable:
+            try:
+                with self.env.cr.savepoint():
+                    deletable.unlink()
+            except Exception:
+                # Referenced by a document the pre-check does not know about
+                _logger.info("Could not delete products %s, archiving them", deletable.ids, exc_info=True)
+                archivable |= deletable.exists()
+        if archivable:
+            archivable.action_archive()
+            archivable.product_tmpl_id.filtered(lambda tmpl: not tmpl.product_variant_ids).action_archive()
+
+    def action_purge(self):
+        """Schedule these vehicles for deletion by the purge scheduled action"""
+        if not self:
+            return False
+        deletable, archivable = self._classify_products_to_remove()
+        self.env.cr.execute(
+            "UPDATE dealership_vehicle SET to_purge = true WHERE id IN %s", (tuple(self.ids),))
+        self.invalidate_recordset(['to_purge'])
+        self.env.ref('car_dealership.ir_cron_dealership_vehicle_purge')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'message': _(
+                    '%(vehicles)s vehicles will be deleted in the background: '
+                    '%(deleted)s products deleted, %(archived)s archived.',
+                    vehicles=len(self), deleted=len(deletable), archived=len(archivable)),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    @api.model
+    def _cron_purge_vehicles(self, batch_size=200, time_budget=None, auto_commit=None):
+        """Delete the vehicles scheduled for purge in chunks of ``batch_size``.
+
+        Each chunk re-checks its products, is deleted in its own savepoint
+        and committed, so a failing chunk or a timeout never undoes the work
+        already done. Orphaned gallery attachments are collected at the end.
+        """
+        if time_budget is None:
+            time_budget = int(self.env['ir.config_parameter'].sudo().get_param(
+                'car_dealership.purge_time_budget', 240))
+        if auto_commit is None:
+            auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        deadline = time.monotonic() + time_budget
+        done = 0
+        while True:
+            vehicles = self.search([('to_purge', '=', True)], order='id', limit=batch_size)
+            if not vehicles:
+                break
+            try:
+                with self.env.cr.savepoint():
+                    vehicles.unlink()
+                done += len(vehicles)
+            except Exception:
+                _logger.exception("Purge of vehicles %s failed, removing them from the queue", vehicles.ids)
+                self.env.cr.execute(
+                    "UPDATE dealership_vehicle SET to_purge = false WHERE id IN %s", (tuple(vehicles.ids),))
+                self.invalidate_model(['to_purge'])
+            if auto_commit:
+                self.env.cr.commit()
+
+            if time.monotonic() >= deadline:
+                remaining = self.search_count([('to_purge', '=', True)])
+                _logger.info("Vehicle purge: time budget exhausted after %s vehicles, %s remaining",
+                             done, remaining)
+                self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+                return done
+
+        self._gc_orphan_media_attachments()
+        _logger.info("Vehicle purge: %s vehicles deleted", done)
+        self.env['ir.cron']._notify_progress(done=done, remaining=0)
+        return done
+
+    @api.model
+    def _gc_orphan_media_attachments(self, batch_size=1000):
+        """Delete gallery images and videos no vehicle refers to anymore"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT att.id
+              FROM ir_attachment att
+             WHERE att.res_model = 'dealership.vehicle'
+               AND att.res_field IS NULL
+               AND (att.mimetype LIKE 'image/%%' OR att.mimetype LIKE 'video/%%')
+               AND att.create_date < (now() at time zone 'UTC') - make_interval(hours => %s)
+               AND NOT EXISTS (SELECT 1 FROM dealership_vehicle_image_rel rel WHERE rel.attachment_id = att.id)
+               AND NOT EXISTS (SELECT 1 FROM dealership_vehicle_video_rel rel WHERE rel.attachment_id = att.id)
+               AND NOT EXISTS (SELECT 1 FROM dealership_vehicle veh WHERE veh.id = att.res_id)
+        """, (ORPHAN_ATTACHMENT_GRACE_HOURS,))
+        attachment_ids = [row[0] for row in self.env.cr.fetchall()]
+        Attachment = self.env['ir.attachment'].sudo()
+        for start in range(0, len(attachment_ids), batch_size):
+            Attachment.browse(attachment_ids[start:start + batch_size]).unlink()
+        return len(attachment_ids)
+
     def _update_product(self):
         """Update corresponding product template with vehicle information"""
         if not self.product_id:
@@ -295,6 +1012,8 @@ class DealershipVehicle(models.Model):
 
     def write(self, vals):
         """Override write to update corresponding product"""
+        if vals.get('vin_number'):
+            vals = dict(vals, vin_number=vin_tools.normalize_vin(vals['vin_number']))
         result = super().write(vals)
 
         # Update product if certain fields change
@@ -305,3 +1024,107 @@ class DealershipVehicle(models.Model):
                 vehicle._update_product()
 
         return result
+
+    def _get_maintenance_reminder_partner(self):
+        """Customer for sold vehicles, the dealership itself for stock units"""
+        self.ensure_one()
+        if self.state == 'sold' and self.sale_order_line_id:
+            return self.sale_order_line_id.order_id.partner_id
+        return self.env.company.partner_id
+
+    def _prepare_maintenance_reminder_mail(self, partner):
+        self.ensure_one()
+        body = Markup(_(
+            '<p>Dear %(partner)s,</p>'
+            '<p>The vehicle <strong>%(vehicle)s</strong> (VIN: %(vin)s) is due '
+            'for maintenance on %(date)s.</p>'
+            '<p>Please contact us to book a service appointment.</p>'
+        )) % {
+            'partner': partner.name,
+            'vehicle': self.name,
+            'vin': self.vin_number or '-',
+            'date': self.next_maintenance_date,
+        }
+        return {
+            'subject': _('Maintenance reminder: %s', self.name),
+            'body_html': body,
+            'email_from': self.env.company.email_formatted or self.env.user.email_formatted,
+            'recipient_ids': [Command.link(partner.id)],
+            'model': self._name,
+            'res_id': self.id,
+            'auto_delete': True,
+        }
+
+    @api.model
+    def _send_maintenance_reminders(self, batch_size=500, time_budget=None, auto_commit=None):
+        """Queue maintenance reminder emails for vehicles that are due.
+
+        Vehicles are processed by increasing id in chunks of ``batch_size``.
+        Each chunk creates its ``mail.mail`` records in one batch (the mail
+        queue cron sends them), moves ``next_maintenance_date`` forward and
+        is committed before the next one. When the time budget runs out the
+        last processed id is stored so the next run resumes from there.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        cursor_key = 'car_dealership.maintenance_reminder_cursor'
+        if time_budget is None:
+            time_budget = int(ICP.get_param(
+                'car_dealership.maintenance_reminder_time_budget', 240))
+        if auto_commit is None:
+            auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        deadline = time.monotonic() + time_budget
+        last_id = int(ICP.get_param(cursor_key, 0))
+        today = fields.Date.context_today(self)
+        done = 0
+
+        while True:
+            vehicles = self.search([
+                ('next_maintenance_date', '<=', today),
+                ('id', '>', last_id),
+            ], order='id', limit=batch_size)
+            if not vehicles:
+                # Full pass completed, start from the beginning next time
+                ICP.set_param(cursor_key, 0)
+                break
+
+            mail_vals_list = []
+            for vehicle in vehicles:
+                partner = vehicle._get_maintenance_reminder_partner()
+                if partner.email:
+                    mail_vals_list.append(
+                        vehicle._prepare_maintenance_reminder_mail(partner))
+            if mail_vals_list:
+                self.env['mail.mail'].sudo().create(mail_vals_list)
+
+            self.env.cr.execute("""
+                UPDATE dealership_vehicle
+                   SET next_maintenance_date = (
+                           %s::date + make_interval(months => GREATEST(COALESCE(maintenance_interval, 0), 1))
+                       )::date,
+                       last_maintenance_reminder = (now() at time zone 'UTC')
+                 WHERE id IN %s
+            """, (today, tuple(vehicles.ids)))
+            vehicles.invalidate_recordset(
+                ['next_maintenance_date', 'last_maintenance_reminder'])
+
+            last_id = vehicles[-1].id
+            done += len(vehicles)
+            ICP.set_param(cursor_key, last_id)
+            if auto_commit:
+                self.env.cr.commit()
+
+            if time.monotonic() >= deadline:
+                remaining = self.search_count([
+                    ('next_maintenance_date', '<=', today),
+                    ('id', '>', last_id),
+                ])
+                _logger.info(
+                    "Maintenance reminders: time budget exhausted after %s vehicles, "
+                    "%s remaining from id %s", done, remaining, last_id)
+                self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+                return done
+
+        _logger.info("Maintenance reminders queued for %s vehicles", done)
+        self.env['ir.cron']._notify_progress(done=done, remaining=0)
+        return done
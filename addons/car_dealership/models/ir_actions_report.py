@@ -0,0 +1,16 @@
+from odoo import models
+from ..tools.replica import call_on_replica
+
+# Reports rendered on the read replica when it is fresh enough
+REPLICA_REPORTS = ('car_dealership.report_dealership_vehicle',)
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_html(self, report_ref, docids, data=None):
+        report = self._get_report(report_ref)
+        if report.report_name not in REPLICA_REPORTS:
+            return super()._render_qweb_html(report_ref, docids, data=data)
+        return call_on_replica(self.env, lambda env: super(IrActionsReport, self.with_env(env))._render_qweb_html(
+            report_ref, docids, data=data))
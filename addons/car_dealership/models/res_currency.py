@@ -0,0 +1,64 @@
+import time
+
+from odoo import models, api
+from odoo.tools.lru import LRU
+
+RATE_CACHE_TTL = 60
+
+# (dbname, currency id, company id, date) -> (expiry, rate); shared by all
+# requests of this worker. Cleared by the rate changes of this worker, the
+# TTL bounds how long the changes made by other workers go unnoticed.
+_rate_cache = LRU(4096)
+
+
+def clear_rate_cache(cr):
+    """Forget the cached rates, now and again if the transaction rolls back"""
+    _rate_cache.clear()
+    cr.postrollback.add(_rate_cache.clear)
+
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+
+    @api.model
+    def _get_dealership_conversion_rate(self, currency_id, company_id, date):
+        """Rate converting ``currency_id`` into the company currency at ``date``,
+        cached per worker across transactions"""
+        key = (self.env.cr.dbname, currency_id, company_id, date)
+        cached = _rate_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        company = self.env['res.company'].browse(company_id)
+        currency = self.browse(currency_id)
+        if currency == company.currency_id:
+            rate = 1.0
+        else:
+            rate = currency._get_conversion_rate(currency, company.currency_id, company, date)
+        _rate_cache[key] = (time.monotonic() + RATE_CACHE_TTL, rate)
+        return rate
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        rates._refresh_dealership_valuation()
+        return rates
+
+    def write(self, vals):
+        result = super().write(vals)
+        self._refresh_dealership_valuation()
+        return result
+
+    def unlink(self):
+        currencies = self.currency_id
+        result = super().unlink()
+        clear_rate_cache(self.env.cr)
+        self.env['dealership.vehicle']._refresh_company_amounts(currency_ids=currencies.ids)
+        return result
+
+    def _refresh_dealership_valuation(self):
+        clear_rate_cache(self.env.cr)
+        self.env['dealership.vehicle']._refresh_company_amounts(currency_ids=self.currency_id.ids)
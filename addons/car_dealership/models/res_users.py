@@ -0,0 +1,22 @@
+from odoo import models, fields, api
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    dealership_branch_ids = fields.Many2many(
+        'stock.warehouse', 'dealership_branch_users_rel', 'user_id', 'warehouse_id',
+        string='Dealership Branches',
+        help="Branches whose vehicles this user works with. Vehicles of other "
+             "branches are hidden unless the user has cross-branch access.")
+
+    @api.model
+    def _get_invalidation_fields(self):
+        # Used by the vehicle record rules, whose domains are cached
+        return super()._get_invalidation_fields() | {'dealership_branch_ids'}
+
+    def _get_default_dealership_branch(self):
+        self.ensure_one()
+        if self.property_warehouse_id in self.dealership_branch_ids:
+            return self.property_warehouse_id
+        return self.dealership_branch_ids[:1]
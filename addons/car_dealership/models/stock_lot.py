@@ -1,7 +1,29 @@
 from odoo import models, fields, api, _
+from ..tools import vin as vin_tools
 
 
 class CarStockLot(models.Model):
     _inherit = 'stock.lot'
 
     name = fields.Char(string='VIN/Chassis Number', required=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = self.env['product.product'].browse(
+            [vals['product_id'] for vals in vals_list if vals.get('product_id')])
+        vehicle_product_ids = set(products.filtered('is_vehicle').ids)
+        for vals in vals_list:
+            if vals.get('name') and vals.get('product_id') in vehicle_product_ids:
+                vals['name'] = vin_tools.normalize_vin(vals['name'])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('name') and all(lot.product_id.is_vehicle for lot in self):
+            vals = dict(vals, name=vin_tools.normalize_vin(vals['name']))
+        return super().write(vals)
+
+    @api.constrains('name', 'product_id')
+    def _check_vehicle_vin(self):
+        vehicle_lots = self.filtered(lambda lot: lot.product_id.is_vehicle)
+        if vehicle_lots:
+            self.env['dealership.vehicle']._validate_vins(vehicle_lots.mapped('name'))
@@ -1,150 +1,183 @@
-from odoo import models, api
+from odoo import models, fields, api, _
 import logging
 from odoo.exceptions import UserError
+from ..tools.profiling import profiled
 
 
 _logger = logging.getLogger(__name__)
 
+# Vehicle fields copied from same-named product attributes when they exist
+PRODUCT_ATTRS = {
+    'color': 'vehicle_color',
+    'fuel_type': 'fuel_type',
+    'transmission': 'transmission',
+    'condition': 'condition',
+    'engine_size': 'engine_size',
+}
+COMMISSION_ATTRS = {
+    'commission_type': 'default_commission_type',
+    'commission_value': 'default_commission_value',
+    'vendor_id': 'default_vendor_id',
+}
+
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
 
-    def create_dealership_vehicles_from_receipt(self):
+    def _prefetch_dealership_lines(self):
+        """Load moves, move lines, lots and products of all pickings at once"""
+        moves = self.move_ids
+        moves.fetch(['product_id', 'picking_id'])
+        lines = moves.move_line_ids
+        lines.fetch(['product_id', 'lot_id', 'lot_name', 'quantity',
+                     'location_dest_id', 'picking_id'])
+        lines.lot_id.fetch(['name'])
+        lines.product_id.fetch(['product_tmpl_id'])
+        lines.product_id.product_tmpl_id.fetch([
+            'name', 'tracking', 'is_vehicle', 'model_id', 'make_id', 'year', 'list_price'])
+        return lines
+
+    def _group_dealership_lines(self, lines):
+        """Split done move lines with a VIN into receipt and delivery lines"""
+        receipt_lines = self.env['stock.move.line']
+        delivery_lines = self.env['stock.move.line']
+        for line in lines:
+            picking = line.picking_id
+            if picking.state != 'done' or not line.lot_id or not line.product_id:
+                continue
+            if picking.picking_type_id.code == 'incoming' and line.quantity > 0:
+                receipt_lines |= line
+            elif picking.picking_type_id.code == 'outgoing':
+                delivery_lines |= line
+        return receipt_lines, delivery_lines
+
+    def _prepare_vehicle_vals_from_move_line(self, move_line):
+        picking = move_line.picking_id
+        product = move_line.product_id
+        lot = move_line.lot_id  # this is the VIN
+        vehicle_vals = {
+            'product_id': product.id,
+            'name': product.name,
+            'vin_number': lot.name,
+            'is_template_dummy': False,
+            'state': 'available',
+            'model_id': product.model_id.id if product.model_id else False,
+            'make_id': product.make_id.id if product.make_id else False,
+            'year': product.year if product.year else False,
+            'quantity': 1,  # Each serial number = 1 vehicle
+            'receipt_date': picking.date_done.date() if picking.date_done else False,
+            'branch_id': move_line.location_dest_id.warehouse_id.id,
+        }
+
+        # Add other product attributes if they exist
+        for vehicle_field, product_field in PRODUCT_ATTRS.items():
+            value = getattr(product, product_field, None)
+            if value:
+                vehicle_vals[vehicle_field] = value
+
+        # Add pricing information
+        if product.standard_price:
+            vehicle_vals['purchase_price'] = product.standard_price
+        if product.list_price:
+            vehicle_vals['selling_price'] = product.list_price
+
+        # Add commission information if available
+        for vehicle_field, product_field in COMMISSION_ATTRS.items():
+            value = getattr(product, product_field, None)
+            if value:
+                vehicle_vals[vehicle_field] = value.id if hasattr(value, 'id') else value
+        return vehicle_vals
+
+    def create_dealership_vehicles_from_receipt(self, receipt_lines=None):
         """Create dealership vehicles from validated receipts"""
-        for picking in self:
-            if picking.picking_type_id.code == 'incoming' and picking.state == 'done':
-                _logger.info(
-                    f"Processing picking {picking.name} with {len(picking.move_line_ids)} move lines")
-
-                for move_line in picking.move_line_ids:
-                    product = move_line.product_id
-                    lot = move_line.lot_id  # this is the VIN
-
-                    _logger.info(
-                        f"Processing move line - Product: {product.name if product else 'None'}, Lot: {lot.name if lot else 'None'}")
-
-                    if product and lot and move_line.qty_done > 0:
-                        # Check if dealership vehicle already exists
-                        exists = self.env['dealership.vehicle'].search(
-                            [('vin_number', '=', lot.name)], limit=1)
-
-                        if not exists:
-                            # Prepare vehicle data
-                            vehicle_vals = {
-                                'product_id': product.id,
-                                'name': product.name,
-                                'vin_number': lot.name,
-                                'is_template_dummy': False,
-                                'state': 'available',
-                                'model_id': product.model_id.id if product.model_id else False,
-                                'make_id': product.make_id.id if product.make_id else False,
-                                'year': product.year if product.year else False,
-                                'quantity': 1,  # Each serial number = 1 vehicle
-                            }
-
-                            # Add other product attributes if they exist
-                            product_attrs = {
-                                'color': 'vehicle_color',
-                                'fuel_type': 'fuel_type',
-                                'transmission': 'transmission',
-                                'condition': 'condition',
-                                'engine_size': 'engine_size',
-                            }
-
-                            for vehicle_field, product_field in product_attrs.items():
-                                if hasattr(product, product_field):
-                                    value = getattr(
-                                        product, product_field, None)
-                                    if value:
-                                        vehicle_vals[vehicle_field] = value
-
-                            # Add pricing information
-                            if product.standard_price:
-                                vehicle_vals['purchase_price'] = product.standard_price
-                            if product.list_price:
-                                vehicle_vals['selling_price'] = product.list_price
-
-                            # Add commission information if available
-                            commission_attrs = {
-                                'commission_type': 'default_commission_type',
-                                'commission_value': 'default_commission_value',
-                                'vendor_id': 'default_vendor_id',
-                            }
-
-                            for vehicle_field, product_field in commission_attrs.items():
-                                if hasattr(product, product_field):
-                                    value = getattr(
-                                        product, product_field, None)
-                                    if value:
-                                        vehicle_vals[vehicle_field] = value.id if hasattr(
-                                            value, 'id') else value
-
-                            _logger.info(
-                                f"Creating vehicle with data: {vehicle_vals}")
-
-                            # Create the vehicle
-                            try:
-                                vehicle = self.env['dealership.vehicle'].create(
-                                    vehicle_vals)
-                                _logger.info(
-                                    f"Successfully created vehicle: {vehicle.name} with VIN: {vehicle.vin_number}")
-
-                                # Post message to picking
-                                picking.message_post(
-                                    body=f"Created dealership vehicle: {vehicle.name} (VIN: {lot.name})"
-                                )
-
-                            except Exception as e:
-                                _logger.error(
-                                    f"Error creating vehicle: {str(e)}")
-                                # Optionally raise the error or continue processing other lines
-                                # raise
-                        else:
-                            _logger.info(
-                                f"Vehicle with VIN {lot.name} already exists, skipping creation")
-
-    def button_validate(self):
-        """Override validate button to create vehicles after validation"""
-        res = super(StockPicking, self).button_validate()
-        # Only create vehicles for successful validations
-        if res:
+        if receipt_lines is None:
+            receipt_lines, _delivery_lines = self._group_dealership_lines(
+                self._prefetch_dealership_lines())
+        if not receipt_lines:
+            return self.env['dealership.vehicle']
+
+        Vehicle = self.env['dealership.vehicle']
+        vins = receipt_lines.lot_id.mapped('name')
+        existing_vins = set(Vehicle.search([('vin_number', 'in', vins)]).mapped('vin_number'))
+
+        vehicles = Vehicle
+        created_by_picking = {}
+        for move_line in receipt_lines:
+            vin = move_line.lot_id.name
+            if vin in existing_vins:
+                _logger.info("Vehicle with VIN %s already exists, skipping creation", vin)
+                continue
+            existing_vins.add(vin)
+            vehicle_vals = self._prepare_vehicle_vals_from_move_line(move_line)
             try:
-                self.create_dealership_vehicles_from_receipt()
+                with self.env.cr.savepoint():
+                    vehicle = Vehicle.create(vehicle_vals)
             except Exception as e:
-                _logger.error(f"Error creating dealership vehicles: {str(e)}")
-                # Optionally show user error or handle gracefully
-
-        for picking in self:
-            if picking.picking_type_id.code == 'outgoing':  # Delivery to customer
-                for move_line in picking.move_line_ids:
-                    lot = move_line.lot_id  # VIN
-                    product = move_line.product_id
-
-                    if lot:
-                        # Find matching dealership.vehicle
-                        vehicle = self.env['dealership.vehicle'].search(
-                            [('vin_number', '=', lot.name)], limit=1
-                        )
-                        if vehicle and vehicle.state != 'sold':
-                            vehicle.write({'state': 'sold'})
-                            _logger.info(
-                                f"Vehicle {vehicle.name} with VIN {lot.name} marked as Sold.")
-                            picking.message_post(
-                                body=f"Vehicle {vehicle.name} (VIN: {lot.name}) marked as Sold."
-                            )
-                        if vehicle.fleet_vehicle_id:
-                            sold_state = self.env['fleet.vehicle.state'].search(
-                                [('name', '=', 'Sold')], limit=1
-                            )
-                            if sold_state:
-                                vehicle.fleet_vehicle_id.write(
-                                    {'state_id': sold_state.id})
-                                _logger.info(
-                                    f"Fleet Vehicle {vehicle.fleet_vehicle_id.name} marked as Sold.")
-
-                        # Add chatter log
-                        picking.message_post(
-                            body=f"Vehicle {vehicle.name} (VIN: {lot.name}) marked as Sold in both Dealership and Fleet."
-                        )
-
+                _logger.error("Error creating vehicle with VIN %s: %s", vin, e)
+                continue
+            vehicles |= vehicle
+            created_by_picking.setdefault(move_line.picking_id, []).append(vehicle)
+
+        for picking, picking_vehicles in created_by_picking.items():
+            picking.message_post(body=_(
+                "Created dealership vehicles: %s",
+                ', '.join('%s (VIN: %s)' % (vehicle.name, vehicle.vin_number)
+                          for vehicle in picking_vehicles)))
+        _logger.info("Created %s dealership vehicles from %s receipts",
+                     len(vehicles), len(created_by_picking))
+        return vehicles
+
+    def _mark_dealership_vehicles_sold(self, delivery_lines):
+        """Mark the vehicles of validated deliveries as sold, grouped per batch"""
+        if not delivery_lines:
+            return
+        vins = delivery_lines.lot_id.mapped('name')
+        vehicles = self.env['dealership.vehicle'].search([('vin_number', 'in', vins)])
+        to_sell = vehicles.filtered(lambda vehicle: vehicle.state != 'sold')
+        if to_sell:
+            to_sell.write({
+                'state': 'sold',
+                'sold_date': fields.Date.context_today(self),
+            })
+        fleet_vehicles = vehicles.fleet_vehicle_id
+        if fleet_vehicles:
+            sold_state = self.env['fleet.vehicle.state'].search([('name', '=', 'Sold')], limit=1)
+            if sold_state:
+                fleet_vehicles.write({'state_id': sold_state.id})
+
+        vehicles_by_vin = {vehicle.vin_number: vehicle for vehicle in vehicles}
+        sold_by_picking = {}
+        for line in delivery_lines:
+            vehicle = vehicles_by_vin.get(line.lot_id.name)
+            if vehicle:
+                sold_by_picking.setdefault(line.picking_id, []).append(vehicle)
+        for picking, picking_vehicles in sold_by_picking.items():
+            picking.message_post(body=_(
+                "Vehicles marked as Sold in both Dealership and Fleet: %s",
+                ', '.join('%s (VIN: %s)' % (vehicle.name, vehicle.vin_number)
+                          for vehicle in picking_vehicles)))
+        _logger.info("Marked %s dealership vehicles as sold", len(to_sell))
+
+    @profiled('stock.picking')
+    def button_validate(self):
+        """Single validation pipeline for dealership receipts and deliveries.
+
+        Moves, lines, lots and products of all pickings are loaded once,
+        VINs are checked set-wise before validation, and the pre-grouped
+        lines are handed over to vehicle processing afterwards.
+        """
+        self._prefetch_dealership_lines()
+        self._check_vin_presence()
+        self._normalize_vehicle_vins()
+        res = super().button_validate()
+
+        # Pickings may still wait on a backorder/immediate transfer wizard
+        lines = self._prefetch_dealership_lines()
+        receipt_lines, delivery_lines = self._group_dealership_lines(lines)
+        try:
+            with self.env.cr.savepoint():
+                self.create_dealership_vehicles_from_receipt(receipt_lines)
+        except Exception as e:
+            _logger.error("Error creating dealership vehicles: %s", e)
+        self._mark_dealership_vehicles_sold(delivery_lines)
         return res
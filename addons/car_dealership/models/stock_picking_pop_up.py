@@ -1,26 +1,43 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from ..tools import vin as vin_tools
 
 
 class StockPickingPopUp(models.Model):
     _inherit = 'stock.picking'
 
-    def button_validate(self):
-        """Override the default validation to ensure a VIN/Chassis
-        number is provided for tracked products.
+    def _check_vin_presence(self):
+        """Ensure a VIN/Chassis number is provided for tracked products.
+
+        Checks every move of every picking at once and reports all missing
+        numbers in a single error.
         """
+        missing = []
         for move in self.move_ids:
             product = move.product_id
-            if product.tracking in ['serial', 'lot']:
-                # Check if there are move lines with tracking info
-                if not move.move_line_ids:
-                    raise UserError(
-                        _("You need to supply a VIN/Chassis Number for product:\n- %s") % product.display_name
-                    )
-                # Check each move line has lot/serial number (check both lot_id AND lot_name)
-                for move_line in move.move_line_ids:
-                    if not move_line.lot_id and not move_line.lot_name:
-                        raise UserError(
-                            _("You need to supply a VIN/Chassis Number for product:\n- %s") % product.display_name
-                        )
-        return super().button_validate()
+            if product.tracking not in ['serial', 'lot']:
+                continue
+            # Check both lot_id AND lot_name on each move line
+            if not move.move_line_ids or any(
+                    not line.lot_id and not line.lot_name for line in move.move_line_ids):
+                label = '%s (%s)' % (product.display_name, move.picking_id.name) \
+                    if len(self) > 1 else product.display_name
+                if label not in missing:
+                    missing.append(label)
+        if missing:
+            raise UserError(
+                _("You need to supply a VIN/Chassis Number for product:\n%s")
+                % '\n'.join('- %s' % label for label in missing)
+            )
+
+    def _normalize_vehicle_vins(self):
+        """Normalize and validate the VINs of all vehicle lines in one pass"""
+        lines = self.move_line_ids.filtered(
+            lambda line: line.product_id.is_vehicle and (line.lot_name or line.lot_id))
+        if not lines:
+            return
+        names = [line.lot_id.name or line.lot_name for line in lines]
+        infos = self.env['dealership.vehicle']._validate_vins(names)
+        for line, info in zip(lines, infos):
+            if not line.lot_id and line.lot_name != info.vin:
+                line.lot_name = info.vin
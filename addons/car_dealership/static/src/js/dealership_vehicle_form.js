@@ -0,0 +1,70 @@
+/** @odoo-module **/
+
+import { onWillStart } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { FormController } from "@web/views/form/form_controller";
+import { formView } from "@web/views/form/form_view";
+
+const NAME_FIELDS = ["model_id", "year", "trim"];
+
+/**
+ * Vehicle form that keeps make/model consistent and composes the vehicle
+ * name locally from the cached catalog instead of server onchanges.
+ */
+export class DealershipVehicleFormController extends FormController {
+    setup() {
+        super.setup();
+        this.vehicleCatalog = useService("dealership_vehicle_catalog");
+        onWillStart(async () => {
+            this.catalog = await this.vehicleCatalog.load();
+        });
+    }
+
+    async onRecordChanged(record, changes) {
+        await super.onRecordChanged(...arguments);
+        if (record !== this.model.root || !this.catalog) {
+            return;
+        }
+        const update = {};
+        if ("make_id" in changes) {
+            const model = record.data.model_id && this.catalog.models.get(record.data.model_id[0]);
+            const makeId = record.data.make_id && record.data.make_id[0];
+            if (model && model.brandId !== makeId) {
+                update.model_id = false;
+            }
+        }
+        if (!("model_id" in update) && NAME_FIELDS.some((field) => field in changes)) {
+            const name = this.composeName(record);
+            if (name && name !== record.data.name) {
+                update.name = name;
+            }
+        }
+        if (Object.keys(update).length) {
+            await record.update(update);
+        }
+    }
+
+    composeName(record) {
+        const model = record.data.model_id && this.catalog.models.get(record.data.model_id[0]);
+        if (!model) {
+            return false;
+        }
+        const brand = this.catalog.brands.get(model.brandId);
+        const parts = [brand ? brand.name : "", model.name];
+        if (record.data.year) {
+            parts.push(String(record.data.year));
+        }
+        if (record.data.trim) {
+            parts.push(record.data.trim);
+        }
+        return parts.filter(Boolean).join(" ");
+    }
+}
+
+export const dealershipVehicleFormView = {
+    ...formView,
+    Controller: DealershipVehicleFormController,
+};
+
+registry.category("views").add("dealership_vehicle_form", dealershipVehicleFormView);
@@ -0,0 +1,99 @@
+/** @odoo-module **/
+
+import { browser } from "@web/core/browser/browser";
+import { registry } from "@web/core/registry";
+
+const CATALOG_URL = "/car_dealership/vehicle_catalog";
+const STORAGE_KEY = "car_dealership.vehicle_catalog";
+
+/**
+ * Build lookup maps from the compact catalog payload
+ * ({v: version, b: brands, m: models, c: categories}).
+ */
+function buildIndex(catalog) {
+    const brands = new Map(catalog.b.map(([id, name]) => [id, { id, name }]));
+    const categories = new Map(catalog.c.map(([id, name]) => [id, { id, name }]));
+    const models = new Map();
+    const modelsByBrand = new Map();
+    for (const [id, name, brandId, categoryId] of catalog.m) {
+        const model = { id, name, brandId, categoryId };
+        models.set(id, model);
+        if (!modelsByBrand.has(brandId)) {
+            modelsByBrand.set(brandId, []);
+        }
+        modelsByBrand.get(brandId).push(model);
+    }
+    return { version: catalog.v, brands, categories, models, modelsByBrand };
+}
+
+function readStoredCatalog() {
+    try {
+        return JSON.parse(browser.localStorage.getItem(STORAGE_KEY));
+    } catch {
+        return null;
+    }
+}
+
+export const vehicleCatalogService = {
+    start() {
+        let loading = null;
+
+        async function fetchCatalog() {
+            const stored = readStoredCatalog();
+            const headers = {};
+            if (stored && stored.v) {
+                headers["If-None-Match"] = `"${stored.v}"`;
+            }
+            let response;
+            try {
+                response = await browser.fetch(CATALOG_URL, { headers, cache: "no-store" });
+            } catch (error) {
+                if (stored) {
+                    return stored;
+                }
+                throw error;
+            }
+            if (response.status === 304 && stored) {
+                return stored;
+            }
+            if (!response.ok) {
+                if (stored) {
+                    return stored;
+                }
+                throw new Error(`Vehicle catalog request failed (${response.status})`);
+            }
+            const catalog = await response.json();
+            try {
+                browser.localStorage.setItem(STORAGE_KEY, JSON.stringify(catalog));
+            } catch {
+                // Storage full or disabled: keep the in-memory copy only.
+            }
+            return catalog;
+        }
+
+        return {
+            /**
+             * Load the catalog once per page; later calls share the result.
+             */
+            load() {
+                if (!loading) {
+                    loading = fetchCatalog()
+                        .then(buildIndex)
+                        .catch((error) => {
+                            loading = null;
+                            throw error;
+                        });
+                }
+                return loading;
+            },
+            /**
+             * Forget the in-memory copy so the next load revalidates.
+             */
+            reset() {
+                loading = null;
+            },
+        };
+    },
+};
+
+registry.category("services").add("dealership_vehicle_catalog", vehicleCatalogService);
@@ -0,0 +1,61 @@
+/** @odoo-module **/
+
+import { Component, onWillStart } from "@odoo/owl";
+import { _t } from "@web/core/l10n/translation";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+
+/**
+ * Model selector filtered by the selected make from the cached catalog,
+ * so changing the make never needs a server round trip.
+ */
+export class VehicleModelSelectField extends Component {
+    static template = "car_dealership.VehicleModelSelectField";
+    static props = { ...standardFieldProps };
+
+    setup() {
+        this.vehicleCatalog = useService("dealership_vehicle_catalog");
+        onWillStart(async () => {
+            this.catalog = await this.vehicleCatalog.load();
+        });
+    }
+
+    get makeId() {
+        const make = this.props.record.data.make_id;
+        return make ? make[0] : false;
+    }
+
+    get value() {
+        const value = this.props.record.data[this.props.name];
+        return value ? value[0] : false;
+    }
+
+    get displayName() {
+        const value = this.props.record.data[this.props.name];
+        return value ? value[1] : "";
+    }
+
+    get options() {
+        return this.makeId ? this.catalog.modelsByBrand.get(this.makeId) || [] : [];
+    }
+
+    get placeholder() {
+        return this.makeId ? "" : _t("Select a make first");
+    }
+
+    onChange(ev) {
+        const model = this.catalog.models.get(parseInt(ev.target.value, 10));
+        this.props.record.update({
+            [this.props.name]: model ? [model.id, model.name] : false,
+        });
+    }
+}
+
+export const vehicleModelSelectField = {
+    component: VehicleModelSelectField,
+    displayName: _t("Vehicle Model"),
+    supportedTypes: ["many2one"],
+};
+
+registry.category("fields").add("dealership_vehicle_model", vehicleModelSelectField);
@@ -0,0 +1,15 @@
+from . import test_dealership_branches
+from . import test_dealership_feed
+from . import test_dealership_profiling
+from . import test_dealership_reconciliation
+from . import test_dealership_telematics
+from . import test_dealership_valuation
+from . import test_dealership_vehicle
+from . import test_dealership_vehicle_purge
+from . import test_dealership_vehicle_reprice
+from . import test_dealership_vehicle_settlement
+from . import test_replica
+from . import test_stock_picking_queries
+from . import test_vehicle_facets
+from . import test_vehicle_index
+from . import test_vin
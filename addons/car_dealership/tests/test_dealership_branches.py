@@ -0,0 +1,65 @@
+from odoo import Command
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class TestDealershipBranches(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.north, cls.south = cls.env['stock.warehouse'].create([
+            {'name': 'North Showroom', 'code': 'NTH'},
+            {'name': 'South Showroom', 'code': 'STH'},
+        ])
+        cls.north_user = new_test_user(cls.env, login='north_seller', groups='base.group_user')
+        cls.south_user = new_test_user(cls.env, login='south_seller', groups='base.group_user')
+        cls.north_user.dealership_branch_ids = [Command.set(cls.north.ids)]
+        cls.south_user.dealership_branch_ids = [Command.set(cls.south.ids)]
+        cls.north_car, cls.south_car = cls.env['dealership.vehicle'].create([{
+            'name': 'Branch Car %s' % index,
+            'vin_number': 'JTDBR32E72000018%s' % index,
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2010 + index,
+            'state': 'available',
+            'is_template_dummy': False,
+            'branch_id': warehouse.id,
+        } for index, warehouse in enumerate([cls.north, cls.south])])
+        cls.vehicles = cls.north_car | cls.south_car
+
+    def _visible(self, user):
+        return self.env['dealership.vehicle'].with_user(user).search([('id', 'in', self.vehicles.ids)])
+
+    def test_users_only_see_their_branches(self):
+        self.assertEqual(self._visible(self.north_user), self.north_car)
+        self.assertEqual(self._visible(self.south_user), self.south_car)
+
+        self.north_user.groups_id = [Command.link(self.env.ref('car_dealership.group_dealership_all_branches').id)]
+        self.assertEqual(self._visible(self.north_user), self.vehicles)
+
+    def test_reassigned_user_follows_new_branch(self):
+        self.assertEqual(self._visible(self.north_user), self.north_car)
+        # The cached rule domain must not keep the previous branches
+        self.north_user.dealership_branch_ids = [Command.set(self.south.ids)]
+        self.assertEqual(self._visible(self.north_user), self.south_car)
+
+    def test_backfill_from_stock(self):
+        product = self.env['product.product'].create({
+            'name': 'Unassigned Corolla',
+            'is_vehicle': True,
+            'is_storable': True,
+            'tracking': 'serial',
+        })
+        lot = self.env['stock.lot'].create({'name': 'JTDBR32E720000189', 'product_id': product.id})
+        self.env['stock.quant']._update_available_quantity(product, self.south.lot_stock_id, 1, lot_id=lot)
+        vehicle = self.env['dealership.vehicle'].create({
+            'name': 'Unassigned Car',
+            'vin_number': lot.name,
+            'make_id': self.env.ref('fleet.model_brand_toyota').id,
+            'model_id': self.env.ref('fleet.model_model_corolla').id,
+            'year': 2009,
+            'branch_id': False,
+        })
+        self.env['dealership.vehicle']._backfill_branches()
+        self.assertEqual(vehicle.branch_id, self.south)
+        self.assertEqual(self._visible(self.north_user), self.north_car)
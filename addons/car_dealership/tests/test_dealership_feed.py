@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipFeed(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vehicle = cls.env['dealership.vehicle'].create({
+            'name': 'Feed Car',
+            'vin_number': 'JTDBR32E720000201',
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2024,
+            'is_template_dummy': False,
+            'state': 'available',
+            'selling_price': 15000,
+        })
+
+    def test_export_to_local_target(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.env['ir.config_parameter'].sudo().set_param('car_dealership.feed_export_root', root)
+            feed = self.env['dealership.feed'].create({
+                'name': '../Test Feed',
+                'feed_format': 'json',
+                'mode': 'delta',
+                'target_directory': 'marketplace',
+            })
+            feed._export_feed()
+            target = os.path.join(root, 'marketplace')
+            files = os.listdir(target)
+            self.assertEqual(files, [feed.attachment_ids.name])
+            self.assertTrue(files[0].startswith('test_feed-'))
+            with open(os.path.join(target, files[0])) as exported:
+                data = json.load(exported)
+            self.assertEqual(data['mode'], 'full')
+            vins = [entry['vin'] for entry in data['vehicles']]
+            self.assertIn('JTDBR32E720000201', vins)
+            self.assertTrue(feed.watermark)
+            self.assertEqual(json.loads(feed.attachment_ids.raw), data)
+
+    def test_target_outside_root_rejected(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.env['ir.config_parameter'].sudo().set_param('car_dealership.feed_export_root', root)
+            for target in ('../escape', '/tmp'):
+                with self.assertRaises(ValidationError):
+                    self.env['dealership.feed'].create({'name': 'Escape', 'target_directory': target})
+
+    def test_csv_and_xml_serializers(self):
+        feed = self.env['dealership.feed'].create({'name': 'Serializers', 'mode': 'full'})
+        header = {'generated_at': '2024-01-01 00:00:00', 'mode': 'full'}
+        entries = list(feed._iter_feed_vehicles())
+        csv_content = ''.join(feed._serialize_csv(iter(entries), header))
+        self.assertIn('JTDBR32E720000201', csv_content)
+        xml_content = ''.join(feed._serialize_xml(iter(entries), header))
+        self.assertIn('<vin>JTDBR32E720000201</vin>', xml_content)
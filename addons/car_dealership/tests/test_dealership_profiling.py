@@ -0,0 +1,63 @@
+import base64
+import gzip
+import time
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.car_dealership.tools import profiling
+
+
+class TestDealershipProfiling(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        # Profiles are stored through a cursor of their own
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def test_match_rule(self):
+        rules = (
+            (1, 7, 'stock.picking.button_validate', 1.0, None),
+            (2, None, 'product.product.search', 1.0, 100.0),
+        )
+        self.assertEqual(profiling.match_rule(rules, 7, 'stock.picking.button_validate'), 1)
+        self.assertIsNone(profiling.match_rule(rules, 8, 'stock.picking.button_validate'))
+        self.assertEqual(profiling.match_rule(rules, 8, 'product.product.search', now=50.0), 2)
+        # Expired
+        self.assertIsNone(profiling.match_rule(rules, 8, 'product.product.search', now=150.0))
+
+    def test_rule_end_is_utc(self):
+        rule = self.env['dealership.profiling.rule'].create({
+            'name': 'One hour',
+            'date_end': fields.Datetime.now() + timedelta(hours=1),
+        })
+        expires_at = dict((entry[0], entry[4]) for entry in rule._get_active_rules())[rule.id]
+        self.assertAlmostEqual(expires_at, time.time() + 3600, delta=60)
+
+    def test_no_profile_without_rule(self):
+        Profile = self.env['dealership.profiling.profile']
+        before = Profile.search_count([])
+        self.env['product.product'].search([('is_vehicle', '=', True)], limit=1)
+        self.assertEqual(Profile.search_count([]), before)
+
+    def test_profile_product_search(self):
+        rule = self.env['dealership.profiling.rule'].create({
+            'name': 'Product search',
+            'user_id': self.env.uid,
+            'target': 'product.product.search',
+        })
+        self.env['product.product'].search([('is_vehicle', '=', True)], limit=1)
+        rule.invalidate_recordset(['profile_ids'])
+        profile = rule.profile_ids
+        self.assertEqual(len(profile), 1)
+        self.assertEqual(profile.target, 'product.product.search')
+        self.assertGreaterEqual(profile.sql_count, 1)
+        folded = gzip.decompress(base64.b64decode(profile.sql_folded)).decode()
+        self.assertIn('SQL: ', folded)
+
+        rule.active = False
+        self.env['product.product'].search([('is_vehicle', '=', True)], limit=1)
+        rule.invalidate_recordset(['profile_ids'])
+        self.assertEqual(len(rule.profile_ids), 1)
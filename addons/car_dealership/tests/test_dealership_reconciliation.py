@@ -0,0 +1,79 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipReconciliation(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.product = cls.env['product.product'].create({
+            'name': 'Reconciled Corolla',
+            'is_vehicle': True,
+            'is_storable': True,
+            'tracking': 'serial',
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2021,
+        })
+        cls.lot = cls.env['stock.lot'].create({
+            'name': 'JTDBR32E720000151',
+            'product_id': cls.product.id,
+        })
+        cls.env['stock.quant']._update_available_quantity(
+            cls.product, cls.warehouse.lot_stock_id, 1, lot_id=cls.lot)
+
+    def _run(self, **vals):
+        reconciliation = self.env['dealership.reconciliation'].create(dict({'mode': 'full'}, **vals))
+        reconciliation.action_run()
+        return reconciliation.line_ids.filtered(lambda line: line.product_id == self.product)
+
+    def test_serial_without_vehicle(self):
+        line = self._run()
+        self.assertEqual(line.discrepancy_type, 'missing_vehicle')
+        self.assertEqual(line.lot_id, self.lot)
+        self.assertEqual(line.warehouse_id, self.warehouse)
+        self.assertFalse(line.corrected)
+
+    def test_auto_correct_creates_and_fixes_vehicles(self):
+        line = self._run(auto_correct=True)
+        self.assertTrue(line.corrected)
+        vehicle = line.vehicle_id
+        self.assertEqual(vehicle.vin_number, self.lot.name)
+        self.assertEqual(vehicle.state, 'available')
+        self.assertEqual(vehicle.branch_id, self.warehouse)
+
+        vehicle.write({'state': 'sold'})
+        line = self._run(auto_correct=True)
+        self.assertEqual(line.discrepancy_type, 'state_mismatch')
+        self.assertEqual(vehicle.state, 'available')
+        self.assertFalse(self._run())
+
+    def test_incremental_skips_products_without_moves(self):
+        self._run()
+        self.assertFalse(self._run(mode='incremental'))
+
+    def test_incremental_picks_up_validated_draft_move(self):
+        product = self.product.copy({'name': 'Late Corolla'})
+        stock = self.warehouse.lot_stock_id
+        move = self.env['stock.move'].create({
+            'name': product.name,
+            'product_id': product.id,
+            'product_uom': product.uom_id.id,
+            'product_uom_qty': 1,
+            'location_id': self.env.ref('stock.stock_location_suppliers').id,
+            'location_dest_id': stock.id,
+        })
+        self._run()
+        # Still draft during the run: the cursor must not move past it
+        move._action_confirm()
+        move._action_assign()
+        move.move_line_ids.write({'lot_name': 'JTDBR32E720000152', 'quantity': 1})
+        move.picked = True
+        move._action_done()
+
+        reconciliation = self.env['dealership.reconciliation'].create({'mode': 'incremental'})
+        reconciliation.action_run()
+        line = reconciliation.line_ids.filtered(lambda line: line.product_id == product)
+        self.assertEqual(line.discrepancy_type, 'missing_vehicle')
+        self.assertEqual(line.lot_id.name, 'JTDBR32E720000152')
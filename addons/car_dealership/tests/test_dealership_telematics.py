@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipTelematics(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vin = 'JTDBR32E720000160'
+        cls.fleet_vehicle = cls.env['fleet.vehicle'].create({
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'vin_sn': cls.vin,
+        })
+        cls.vehicle = cls.env['dealership.vehicle'].create({
+            'name': 'Connected Corolla',
+            'vin_number': cls.vin,
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2021,
+            'mileage': 1000.0,
+            'fleet_vehicle_id': cls.fleet_vehicle.id,
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.env['ir.config_parameter'].sudo().set_param('car_dealership.telematics_directory', self.directory)
+
+    def _drop(self, name, content):
+        with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as reading_file:
+            reading_file.write(content)
+
+    def _odometers(self):
+        return self.env['fleet.vehicle.odometer'].search(
+            [('vehicle_id', '=', self.fleet_vehicle.id)], order='date')
+
+    def test_ingest_keeps_highest_daily_reading(self):
+        self._drop('readings.csv', '\n'.join([
+            'vin,odometer,date',
+            '%s,1200,2024-03-01' % self.vin.lower(),
+            '%s,1250,2024-03-01' % self.vin,
+            '%s,1400,2024-03-02' % self.vin,
+            'WVWZZZ1JZXW000001,500,2024-03-01',
+            '%s,not a number,2024-03-03' % self.vin,
+        ]))
+        self.assertEqual(self.env['dealership.telematics']._cron_ingest_readings(auto_commit=False), 1)
+
+        self.assertEqual(self._odometers().mapped('value'), [1250.0, 1400.0])
+        self.assertEqual(self.vehicle.mileage, 1400.0)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'readings.csv')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'processed', 'readings.csv')))
+
+    def test_ingest_is_idempotent_and_never_rolls_back(self):
+        self._drop('a.jsonl', '{"vin": "%s", "odometer": 1300, "date": "2024-03-01"}\n' % self.vin)
+        self._drop('b.jsonl', '\n'.join([
+            '{"vin": "%s", "odometer": 1300, "date": "2024-03-01"}' % self.vin,
+            '{"vin": "%s", "odometer": 900, "date": "2024-02-01"}' % self.vin,
+        ]))
+        self.env['dealership.telematics']._cron_ingest_readings(auto_commit=False)
+
+        # the replayed reading is skipped, the older one only fills the fleet history
+        self.assertEqual(self._odometers().mapped('value'), [900.0, 1300.0])
+        self.assertEqual(self.vehicle.mileage, 1300.0)
@@ -0,0 +1,68 @@
+from datetime import date
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipValuation(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.currency = cls.env['res.currency'].create({'name': 'XDL', 'symbol': 'D'})
+        cls.env['res.currency.rate'].create({
+            'currency_id': cls.currency.id,
+            'company_id': cls.env.company.id,
+            'name': date(2024, 1, 1),
+            'rate': 0.5,
+        })
+        cls.vehicle = cls.env['dealership.vehicle'].create({
+            'name': 'Imported Car',
+            'vin_number': 'WVWZZZ1JZXW000191',
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2007,
+            'currency_id': cls.currency.id,
+            'purchase_price': 1000,
+            'selling_price': 1600,
+            'receipt_date': date(2024, 3, 1),
+        })
+
+    def _amounts(self):
+        return self.vehicle.read(['purchase_price_company', 'selling_price_company', 'margin_company'])[0]
+
+    def test_refresh_matches_orm_compute(self):
+        self.assertAlmostEqual(self.vehicle.purchase_price_company, 2000.0)
+        self.assertAlmostEqual(self.vehicle.selling_price_company, 3200.0)
+        self.env['dealership.vehicle']._refresh_company_amounts(ids=self.vehicle.ids)
+        amounts = self._amounts()
+        self.assertAlmostEqual(amounts['purchase_price_company'], 2000.0)
+        self.assertAlmostEqual(amounts['selling_price_company'], 3200.0)
+        self.assertAlmostEqual(amounts['margin_company'], 1200.0)
+
+    def test_new_rate_revalues_unsold_vehicles(self):
+        rate = self.env['res.currency.rate'].create({
+            'currency_id': self.currency.id,
+            'company_id': self.env.company.id,
+            'name': fields.Date.context_today(self.vehicle),
+            'rate': 0.8,
+        })
+        # Cost stays at the receipt date rate, the price follows the latest one
+        amounts = self._amounts()
+        self.assertAlmostEqual(amounts['purchase_price_company'], 2000.0)
+        self.assertAlmostEqual(amounts['selling_price_company'], 2000.0)
+
+        rate.rate = 0.4
+        self.assertAlmostEqual(self._amounts()['selling_price_company'], 4000.0)
+        rate.unlink()
+        self.assertAlmostEqual(self._amounts()['selling_price_company'], 3200.0)
+
+    def test_rate_write_clears_cached_rate(self):
+        Currency = self.env['res.currency']
+        key = (self.currency.id, self.env.company.id, date(2024, 6, 1))
+        self.assertAlmostEqual(Currency._get_dealership_conversion_rate(*key), 2.0)
+        rate = self.currency.rate_ids.filtered(lambda rate: rate.name == date(2024, 1, 1))
+        rate.rate = 0.25
+        self.assertAlmostEqual(Currency._get_dealership_conversion_rate(*key), 4.0)
+        rate.unlink()
+        self.assertAlmostEqual(Currency._get_dealership_conversion_rate(*key), 1.0)
@@ -4,7 +4,7 @@ class TestDealershipVehicle(TransactionCase):
     def test_create_vehicle(self):
         vehicle = self.env['dealership.vehicle'].create({
             'name': 'Test Car',
-            'vin_number': 'TESTVIN123456',
+            'vin_number': 'JTDBR32E720000101',
             'make_id': self.env.ref('fleet.model_brand_toyota').id,
             'model_id': self.env.ref('fleet.model_model_corolla').id,
             'year': 2024,
@@ -16,7 +16,7 @@ class TestDealershipVehicle(TransactionCase):
         partner = self.env['res.partner'].create({'name': 'Dealer Partner'})
         vehicle = self.env['dealership.vehicle'].create({
             'name': 'Dealer Car',
-            'vin_number': 'VINDEALER123',
+            'vin_number': 'JTDBR32E720000102',
             'make_id': self.env.ref('fleet.model_brand_toyota').id,
             'model_id': self.env.ref('fleet.model_model_corolla').id,
             'year': 2023,
@@ -32,7 +32,7 @@ class TestDealershipVehicle(TransactionCase):
         partner = self.env['res.partner'].create({'name': 'Consignor Partner'})
         vehicle = self.env['dealership.vehicle'].create({
             'name': 'Consigned Car',
-            'vin_number': 'VINCONSIGN123',
+            'vin_number': 'JTDBR32E720000103',
             'make_id': self.env.ref('fleet.model_brand_toyota').id,
             'model_id': self.env.ref('fleet.model_model_corolla').id,
             'year': 2022,
@@ -47,7 +47,7 @@ class TestDealershipVehicle(TransactionCase):
     def test_unique_vin_constraint(self):
         self.env['dealership.vehicle'].create({
             'name': 'Car1',
-            'vin_number': 'VINUNIQUE123',
+            'vin_number': 'JTDBR32E720000104',
             'make_id': self.env.ref('fleet.model_brand_toyota').id,
             'model_id': self.env.ref('fleet.model_model_corolla').id,
             'year': 2025,
@@ -56,7 +56,7 @@ class TestDealershipVehicle(TransactionCase):
         with self.assertRaises(Exception):
             self.env['dealership.vehicle'].create({
                 'name': 'Car2',
-                'vin_number': 'VINUNIQUE123',
+                'vin_number': 'JTDBR32E720000104',
                 'make_id': self.env.ref('fleet.model_brand_toyota').id,
                 'model_id': self.env.ref('fleet.model_model_corolla').id,
                 'year': 2025,
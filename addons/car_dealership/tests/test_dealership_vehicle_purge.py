@@ -0,0 +1,56 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipVehiclePurge(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Vehicle = cls.env['dealership.vehicle']
+        cls.vehicles = cls.Vehicle.create([{
+            'name': 'Purge Car %s' % index,
+            'vin_number': 'JTDBR32E72000013%s' % index,
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            # Draft vehicles must not share model and year
+            'year': 2018 + index,
+        } for index in range(2)])
+
+    def test_purge_archives_referenced_products(self):
+        free, referenced = self.vehicles
+        free_product, referenced_product = free.product_id, referenced.product_id
+        self.env['stock.lot'].create({
+            'name': referenced.vin_number,
+            'product_id': referenced_product.id,
+        })
+        deletable, archivable = self.vehicles._classify_products_to_remove()
+        self.assertEqual(deletable, free_product)
+        self.assertEqual(archivable, referenced_product)
+
+        self.vehicles.action_purge()
+        self.assertTrue(all(self.vehicles.mapped('to_purge')))
+        self.Vehicle._cron_purge_vehicles(batch_size=1, auto_commit=False)
+
+        self.assertFalse(self.vehicles.exists())
+        self.assertFalse(free_product.exists())
+        self.assertTrue(referenced_product.exists())
+        self.assertFalse(referenced_product.active)
+
+    def test_gc_orphan_media_attachments(self):
+        vehicle = self.vehicles[0]
+        kept, orphan = self.env['ir.attachment'].create([{
+            'name': name,
+            'raw': b'GIF89a',
+            'mimetype': 'image/gif',
+            'res_model': 'dealership.vehicle',
+            'res_id': res_id,
+        } for name, res_id in [('kept.gif', vehicle.id), ('orphan.gif', 0)]])
+        vehicle.dealership_image_ids = kept
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE ir_attachment SET create_date = now() - interval '2 days' WHERE id IN %s",
+            (tuple((kept | orphan).ids),))
+
+        self.assertEqual(self.Vehicle._gc_orphan_media_attachments(), 1)
+        self.assertTrue(kept.exists())
+        self.assertFalse(orphan.exists())
@@ -0,0 +1,50 @@
+import numpy as np
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class TestDealershipVehicleReprice(TransactionCase):
+    def _inputs(self, **overrides):
+        year = fields.Date.today().year
+        inputs = {
+            'id': np.array([1, 2, 3]),
+            'year': np.array([year, year - 5, 0]),
+            'mileage': np.array([0.0, 50000.0, 0.0]),
+            'condition': np.array(['new', 'local_used', ''], dtype=object),
+            'fuel_type': np.array(['petrol', 'hybrid', ''], dtype=object),
+            'purchase_price': np.array([10000.0, 10000.0, 10000.0]),
+            'selling_price': np.array([0.0, 0.0, 0.0]),
+            'days_in_stock': np.array([0.0, 95.0, 0.0]),
+        }
+        inputs.update(overrides)
+        return inputs
+
+    def test_compute_prices(self):
+        wizard = self.env['dealership.vehicle.reprice'].create({
+            'markup': 20.0,
+            'yearly_depreciation': 2.0,
+            'mileage_depreciation': 1.0,
+            'local_used_factor': 0.9,
+            'electrified_premium': 0.0,
+            'aging_discount': 1.0,
+            'min_margin': 0.0,
+            'rounding': 0.0,
+        })
+        prices = wizard._compute_prices(self._inputs())
+        self.assertAlmostEqual(prices[0], 12000.0)
+        # 5 years * 2% + 5 * 1% = 15% depreciation, 0.9 condition, 3% aging
+        self.assertAlmostEqual(prices[1], 12000.0 * 0.85 * 0.9 * 0.97)
+        self.assertAlmostEqual(prices[2], 12000.0)
+
+    def test_minimum_margin_and_rounding(self):
+        wizard = self.env['dealership.vehicle.reprice'].create({
+            'markup': 0.0,
+            'max_depreciation': 50.0,
+            'yearly_depreciation': 10.0,
+            'min_margin': 5.0,
+            'rounding': 1000.0,
+        })
+        prices = wizard._compute_prices(self._inputs())
+        self.assertTrue(np.all(prices >= 10000.0))
+        self.assertTrue(np.all(prices % 1000.0 == 0))
@@ -0,0 +1,59 @@
+from datetime import date
+
+import numpy as np
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDealershipVehicleSettlement(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vendor = cls.env['res.partner'].create({'name': 'Network Dealer'})
+        common = {
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2022,
+            'state': 'sold',
+            'sold_date': date(2024, 5, 10),
+            'vendor_id': cls.vendor.id,
+            'currency_id': cls.env.company.currency_id.id,
+        }
+        cls.vehicles = cls.env['dealership.vehicle'].create([
+            dict(common, name='Network Car', vin_number='JTDBR32E720000171', selling_price=10000,
+                 business_type='dealer_network', commission_type='percentage', commission_value=10),
+            dict(common, name='Consigned Car', vin_number='JTDBR32E720000172', selling_price=8000,
+                 business_type='consigned', commission_type='fixed', commission_value=500),
+            dict(common, name='Owned Car', vin_number='JTDBR32E720000173', selling_price=9000,
+                 business_type='owner'),
+        ])
+        cls.Settlement = cls.env['dealership.vehicle.settlement']
+
+    def _settle(self):
+        return self.Settlement._settle(date(2024, 5, 1), date(2024, 5, 31), self.env.company)
+
+    def test_compute_commissions(self):
+        commissions = self.Settlement._compute_commissions(
+            np.array([10000.0, 8000.0, 100.0]),
+            np.array(['percentage', 'fixed', 'fixed'], dtype=object),
+            np.array([10.0, 500.0, 500.0]), 2)
+        self.assertEqual(commissions.tolist(), [1000.0, 500.0, 100.0])
+
+    def test_one_bill_per_vendor(self):
+        bills = self._settle()
+        self.assertEqual(len(bills), 1)
+        self.assertEqual(bills.partner_id, self.vendor)
+        self.assertEqual(bills.move_type, 'in_invoice')
+        self.assertEqual(bills.invoice_line_ids.vehicle_id, self.vehicles[:2])
+        self.assertAlmostEqual(bills.amount_total, 9000.0 + 7500.0)
+
+    def test_settlement_is_idempotent(self):
+        bills = self._settle()
+        self.assertFalse(self._settle())
+
+        # Cancelled bills release their vehicles
+        bills.button_cancel()
+        self.assertEqual(self._settle().invoice_line_ids.vehicle_id, self.vehicles[:2])
@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.car_dealership.tools import replica
+
+
+class TestReplicaRouting(TransactionCase):
+
+    def test_falls_back_to_primary_without_replica(self):
+        with patch.object(type(self.registry), '_db_readonly', None, create=True):
+            result = replica.call_on_replica(self.env, lambda env: env.cr is self.env.cr)
+        self.assertTrue(result)
+
+    def test_max_lag_parameter(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param(replica.MAX_LAG_PARAM, '12')
+        self.assertEqual(replica.get_max_lag(self.env), 12)
+        self.assertEqual(replica.get_max_lag(self.env, max_lag=5), 5)
+        ICP.set_param(replica.MAX_LAG_PARAM, 'soon')
+        self.assertEqual(replica.get_max_lag(self.env), replica.DEFAULT_MAX_LAG)
+
+    def test_lag_of_primary_is_zero(self):
+        self.assertEqual(replica.get_replica_lag(self.env.cr), 0)
+
+    def test_valuation_totals_on_primary(self):
+        self.env['ir.config_parameter'].sudo().set_param(replica.MAX_LAG_PARAM, '0')
+        totals = self.env['dealership.vehicle'].get_valuation_totals([('id', '=', 0)])
+        self.assertEqual(totals['count'], 0)
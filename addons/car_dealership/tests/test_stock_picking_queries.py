@@ -0,0 +1,128 @@
+from odoo import Command
+from odoo.tests.common import TransactionCase
+
+
+class TestStockPickingQueries(TransactionCase):
+    """The dealership steps of a validation cost as many queries for one
+    vehicle as for several: lines are loaded, checked and grouped set-wise."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.product = cls.env['product.product'].create({
+            'name': 'Counted Corolla',
+            'is_vehicle': True,
+            'is_storable': True,
+            'tracking': 'serial',
+            'make_id': cls.env.ref('fleet.model_brand_toyota').id,
+            'model_id': cls.env.ref('fleet.model_model_corolla').id,
+            'year': 2019,
+        })
+        cls.suppliers = cls.env.ref('stock.stock_location_suppliers')
+        cls.customers = cls.env.ref('stock.stock_location_customers')
+        cls.vin_count = 0
+
+    def _vins(self, count):
+        vins = ['JTDBR32E7200002%02d' % (self.vin_count + index) for index in range(count)]
+        type(self).vin_count += count
+        return vins
+
+    def _picking(self, picking_type, source, destination, quantity):
+        return self.env['stock.picking'].create({
+            'picking_type_id': picking_type.id,
+            'location_id': source.id,
+            'location_dest_id': destination.id,
+            'move_ids': [Command.create({
+                'name': self.product.name,
+                'product_id': self.product.id,
+                'product_uom': self.product.uom_id.id,
+                'product_uom_qty': quantity,
+                'location_id': source.id,
+                'location_dest_id': destination.id,
+            })],
+        })
+
+    def _receipt(self, count):
+        stock = self.warehouse.lot_stock_id
+        picking = self._picking(self.warehouse.in_type_id, self.suppliers, stock, count)
+        picking.action_confirm()
+        move = picking.move_ids
+        move.move_line_ids.unlink()
+        self.env['stock.move.line'].create([{
+            'move_id': move.id,
+            'picking_id': picking.id,
+            'product_id': self.product.id,
+            'product_uom_id': self.product.uom_id.id,
+            'lot_name': vin,
+            'quantity': 1,
+            'location_id': self.suppliers.id,
+            'location_dest_id': stock.id,
+        } for vin in self._vins(count)])
+        move.picked = True
+        return picking
+
+    def _delivery(self, count):
+        stock = self.warehouse.lot_stock_id
+        for vin in self._vins(count):
+            lot = self.env['stock.lot'].create({'name': vin, 'product_id': self.product.id})
+            self.env['stock.quant']._update_available_quantity(self.product, stock, 1, lot_id=lot)
+            self.env['dealership.vehicle'].create({
+                'name': 'Delivered %s' % vin,
+                'vin_number': vin,
+                'make_id': self.product.make_id.id,
+                'model_id': self.product.model_id.id,
+                'year': 2019,
+                'state': 'available',
+                'is_template_dummy': False,
+            })
+        picking = self._picking(self.warehouse.out_type_id, stock, self.customers, count)
+        picking.action_confirm()
+        picking.action_assign()
+        picking.move_ids.picked = True
+        return picking
+
+    def _count_queries(self, func):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.cr.sql_log_count - before
+
+    def _assert_constant(self, make_picking, step):
+        single = self._count_queries(lambda: step(make_picking(1)))
+        several = make_picking(5)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        with self.assertQueryCount(single):
+            step(several)
+
+    @staticmethod
+    def _check_lines(picking):
+        picking._prefetch_dealership_lines()
+        picking._check_vin_presence()
+        picking._normalize_vehicle_vins()
+
+    def test_receipt_checks(self):
+        self._assert_constant(self._receipt, self._check_lines)
+
+    def test_delivery_checks(self):
+        self._assert_constant(self._delivery, self._check_lines)
+
+    def test_delivery_marks_vehicles_sold(self):
+        def validated_delivery(count):
+            picking = self._delivery(count)
+            picking.button_validate()
+            self.assertEqual(picking.state, 'done')
+            vehicles = self.env['dealership.vehicle'].search([('vin_number', 'in', picking.move_line_ids.lot_id.mapped('name'))])
+            self.assertEqual(set(vehicles.mapped('state')), {'sold'})
+            vehicles.write({'state': 'available', 'sold_date': False})
+            return picking
+
+        def mark_sold(picking):
+            _receipt_lines, delivery_lines = picking._group_dealership_lines(picking._prefetch_dealership_lines())
+            # Chatter tracking writes one message per vehicle by design
+            picking.with_context(tracking_disable=True)._mark_dealership_vehicles_sold(delivery_lines)
+
+        self._assert_constant(validated_delivery, mark_sold)
@@ -0,0 +1,58 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestVehicleFacets(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.brand = cls.env['fleet.vehicle.model.brand'].create({'name': 'Facet Motors'})
+        cls.models = cls.env['fleet.vehicle.model'].create([
+            {'name': 'Alpha', 'brand_id': cls.brand.id},
+            {'name': 'Beta', 'brand_id': cls.brand.id},
+        ])
+        cls.vehicles = cls.env['dealership.vehicle'].create([{
+            'name': 'Facet Car %s' % index,
+            'vin_number': 'JTDBR32E72000016%s' % index,
+            'is_template_dummy': False,
+            'state': 'available',
+            'make_id': cls.brand.id,
+            'model_id': model.id,
+            'year': year,
+            'selling_price': price,
+            'fuel_type': fuel,
+        } for index, (model, year, price, fuel) in enumerate([
+            (cls.models[0], 2012, 8000, 'petrol'),
+            (cls.models[0], 2021, 42000, 'diesel'),
+            (cls.models[1], 2021, 23000, 'petrol'),
+        ])])
+
+    def setUp(self):
+        super().setUp()
+        # The facet index syncs through a cursor of its own
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def _counts(self, result, facet):
+        return {entry['value']: entry['count'] for entry in result['facets'][facet]}
+
+    def test_counts_and_ids_in_one_call(self):
+        Vehicle = self.env['dealership.vehicle'].sudo()
+        result = Vehicle.search_facets({'make_id': [self.brand.id]}, limit=0)
+        self.assertEqual(sorted(result['ids']), self.vehicles.ids)
+        self.assertEqual(self._counts(result, 'model_id'), {self.models[0].id: 2, self.models[1].id: 1})
+        self.assertEqual(self._counts(result, 'fuel_type'), {'petrol': 2, 'diesel': 1})
+
+        result = Vehicle.search_facets({'make_id': [self.brand.id], 'fuel_type': ['petrol']}, limit=0)
+        self.assertEqual(sorted(result['ids']), (self.vehicles[0] | self.vehicles[2]).ids)
+        # A facet's own selection does not shrink its counts
+        self.assertEqual(self._counts(result, 'fuel_type'), {'petrol': 2, 'diesel': 1})
+        self.assertEqual(self._counts(result, 'model_id'), {self.models[0].id: 1, self.models[1].id: 1})
+
+    def test_index_follows_writes(self):
+        Vehicle = self.env['dealership.vehicle'].sudo()
+        self.vehicles[1].write({'state': 'sold'})
+        self.vehicles[2].write({'fuel_type': 'hybrid'})
+        result = Vehicle.search_facets({'make_id': [self.brand.id]}, limit=0)
+        self.assertEqual(sorted(result['ids']), (self.vehicles[0] | self.vehicles[2]).ids)
+        self.assertEqual(self._counts(result, 'fuel_type'), {'petrol': 1, 'hybrid': 1})
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from odoo.tests import BaseCase
+
+from odoo.addons.car_dealership.tools.vehicle_index import WATERMARK_EPOCH
+from odoo.addons.car_dealership.tools.vehicle_similarity import VehicleSimilarityIndex
+
+
+def _row(vehicle_id, year=2020, mileage=50000, price=20000, model=1, alive=True,
+         write_date=datetime(2024, 1, 1)):
+    return (vehicle_id, write_date, alive, year, mileage, price,
+            None, 'petrol', 'manual', 'new', 1, model)
+
+
+class TestVehicleIndex(BaseCase):
+    """Snapshot maintenance and kNN search, without database"""
+
+    def _index(self, rows=()):
+        index = VehicleSimilarityIndex()
+        index.watermark = WATERMARK_EPOCH
+        index.arrays = index._encode_rows([])
+        if rows:
+            index._apply(list(rows))
+        return index
+
+    def _year(self, index, vehicle_id):
+        return int(index.arrays['numeric'][index.positions[vehicle_id]][0])
+
+    def test_apply_upserts_and_removes(self):
+        index = self._index([_row(1), _row(2), _row(3)])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.ids.tolist(), [1, 2, 3])
+
+        index._apply([
+            _row(2, year=2015, write_date=datetime(2024, 2, 1)),
+            _row(3, alive=False),
+            _row(4, year=2022),
+        ])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(sorted(index.positions), [1, 2, 4])
+        self.assertEqual(self._year(index, 2), 2015)
+        self.assertEqual(self._year(index, 4), 2022)
+        self.assertFalse(index.alive[2])
+        self.assertEqual(index.watermark, datetime(2024, 2, 1))
+
+    def test_compact_keeps_rows_aligned(self):
+        index = self._index([_row(vehicle_id, year=2000 + vehicle_id % 20) for vehicle_id in range(1, 101)])
+        index._apply([_row(vehicle_id, alive=False) for vehicle_id in range(1, 41)])
+        # Compacted once less than 75% of the rows are alive
+        self.assertEqual(len(index.ids), 60)
+        self.assertTrue(index.alive.all())
+        for vehicle_id in (41, 77, 100):
+            self.assertEqual(index.ids[index.positions[vehicle_id]], vehicle_id)
+            self.assertEqual(self._year(index, vehicle_id), 2000 + vehicle_id % 20)
+
+    def test_nearest(self):
+        index = self._index([
+            _row(1, year=2020, mileage=40000, price=20000),
+            _row(2, year=2020, mileage=42000, price=21000),
+            _row(3, year=2008, mileage=190000, price=4000),
+            _row(4, year=2020, mileage=41000, price=20500, model=2),
+        ])
+        categories = (None, 'petrol', 'manual', 'new', 1, 1)
+        matches = index.nearest((2020, 40000, 20000), categories, 2, exclude_id=1)
+        self.assertEqual([vehicle_id for vehicle_id, _distance in matches], [2, 4])
+        self.assertLessEqual(matches[0][1], matches[1][1])
+
+        # k larger than the inventory, removed vehicles are never returned
+        index._apply([_row(2, alive=False)])
+        matches = index.nearest((2020, 40000, 20000), categories, 10, exclude_id=1)
+        self.assertEqual([vehicle_id for vehicle_id, _distance in matches], [4, 3])
+        self.assertEqual(index.nearest((2020, 40000, 20000), categories, 0), [])
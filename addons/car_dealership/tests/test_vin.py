@@ -0,0 +1,52 @@
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.car_dealership.tools import vin as vin_tools
+
+
+class TestVin(TransactionCase):
+    def test_normalize_and_check_digit(self):
+        info, bad_check, bad_chars, chassis = vin_tools.validate_vins([
+            ' 1hgcm82633a004352 ', '1HGCM82633A004353', '1HGCM8263OA004352', 'nze121-1234567',
+        ])
+        self.assertEqual(info.vin, '1HGCM82633A004352')
+        self.assertFalse(info.error)
+        self.assertTrue(info.check_digit_valid)
+        self.assertEqual(info.manufacturer, 'Honda')
+        self.assertEqual(info.model_year, 2003)
+        self.assertEqual(bad_check.error, vin_tools.ERROR_CHECK_DIGIT)
+        self.assertEqual(bad_chars.error, vin_tools.ERROR_CHARACTERS)
+        self.assertFalse(chassis.error)
+        self.assertEqual(chassis.vin, 'NZE121-1234567')
+
+    def test_check_digit_only_enforced_in_north_america(self):
+        info = vin_tools.validate_vins(['WVWZZZ1JZXW000001'])[0]
+        self.assertFalse(info.error)
+        self.assertFalse(info.check_digit_valid)
+        self.assertEqual(info.model_year, 1999)
+
+    def test_vehicle_vin_autofill(self):
+        toyota = self.env.ref('fleet.model_brand_toyota')
+        vehicle = self.env['dealership.vehicle'].create({
+            'name': 'Decoded Car',
+            'vin_number': 'jtdbr32e720000301',
+            'model_id': self.env.ref('fleet.model_model_corolla').id,
+        })
+        self.assertEqual(vehicle.vin_number, 'JTDBR32E720000301')
+        self.assertEqual(vehicle.make_id, toyota)
+        self.assertEqual(vehicle.year, 2002)
+
+    def test_chassis_numbers_follow_the_frame_format(self):
+        infos = vin_tools.validate_vins(['BNR32-000123', 'CT9A-0001234', 'NZO121-1234567', 'AB-123', 'X-1'])
+        self.assertEqual([bool(info.error) for info in infos], [False, False, True, True, True])
+
+    def test_invalid_vin_rejected(self):
+        # Model and year free of any draft, so only the VIN check can fail
+        with self.assertRaisesRegex(ValidationError, 'Invalid VIN'):
+            self.env['dealership.vehicle'].create({
+                'name': 'Typo Car',
+                'vin_number': 'VINUNIQUE123',
+                'make_id': self.env.ref('fleet.model_brand_toyota').id,
+                'model_id': self.env.ref('fleet.model_model_corolla').id,
+                'year': 1998,
+            })
@@ -0,0 +1,6 @@
+from . import profiling
+from . import replica
+from . import vehicle_facets
+from . import vehicle_index
+from . import vehicle_similarity
+from . import vin
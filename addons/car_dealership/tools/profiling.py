@@ -0,0 +1,192 @@
+"""On-demand profiling of selected dealership entry points.
+
+Methods decorated with ``profiled(model_name)`` are run under the Odoo
+profiler when an active ``dealership.profiling.rule`` matches the current
+user and method, at the rule's sampling rate. While no rule is active the
+only cost is one ormcache lookup per call.
+
+Each profiled call stores Python samples and SQL statements as gzipped
+folded stacks (``frame;frame;frame weight`` lines, as read by
+flamegraph.pl, speedscope or inferno), weights being milliseconds.
+"""
+from collections import Counter
+import base64
+import functools
+import gzip
+import logging
+import os
+import random
+import threading
+import time
+
+from odoo import api, SUPERUSER_ID
+from odoo.tools import cache as ormcache_module
+from odoo.tools.profiler import Profiler
+
+_logger = logging.getLogger(__name__)
+
+RULE_MODEL = 'dealership.profiling.rule'
+PROFILE_MODEL = 'dealership.profiling.profile'
+
+# "model.method" of every decorated method, for the rule selection
+TARGETS = set()
+
+_local = threading.local()
+
+
+def profiled(model_name):
+    """Profile the decorated method when a profiling rule asks for it"""
+    def decorate(func):
+        target = '%s.%s' % (model_name, func.__name__)
+        TARGETS.add(target)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if getattr(_local, 'active', False) or RULE_MODEL not in self.env.registry:
+                return func(self, *args, **kwargs)
+            rules = self.env[RULE_MODEL]._get_active_rules()
+            if not rules:
+                return func(self, *args, **kwargs)
+            rule_id = match_rule(rules, self.env.uid, target)
+            if not rule_id:
+                return func(self, *args, **kwargs)
+            return _run_profiled(self, func, target, rule_id, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def match_rule(rules, uid, target, now=None):
+    """Id of the first rule of ``rules`` selecting this call, after sampling"""
+    now = now or time.time()
+    for rule_id, user_id, rule_target, sample_rate, expires_at in rules:
+        if user_id and user_id != uid:
+            continue
+        if rule_target and rule_target != target:
+            continue
+        if expires_at and expires_at < now:
+            continue
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            continue
+        return rule_id
+    return None
+
+
+def _ormcache_misses(dbname):
+    """Total ormcache misses of the database, counters being keyed by
+    (dbname, cache name, method) since Odoo 17 and (dbname, method) before"""
+    counters = getattr(ormcache_module, '_COUNTERS', None)
+    if counters is None:
+        counters = getattr(ormcache_module, 'STAT', {})
+    return sum(getattr(counter, 'miss', 0) for key, counter in list(counters.items()) if key[0] == dbname)
+
+
+def _run_profiled(record, func, target, rule_id, args, kwargs):
+    env = record.env
+    dbname = env.cr.dbname
+    misses_before = _ormcache_misses(dbname)
+    profiler = Profiler(collectors=['sql', 'traces_async'], db=None, description=target)
+    _local.active = True
+    started = time.perf_counter()
+    failed = True
+    try:
+        with profiler:
+            result = func(record, *args, **kwargs)
+        failed = False
+        return result
+    finally:
+        _local.active = False
+        duration = time.perf_counter() - started
+        try:
+            vals = build_profile_vals(profiler, target, duration)
+            vals.update({
+                'rule_id': rule_id,
+                'user_id': env.uid,
+                'failed': failed,
+                'ormcache_misses': _ormcache_misses(dbname) - misses_before,
+            })
+            # Own transaction: kept even when the profiled call rolls back
+            with env.registry.cursor() as cr:
+                api.Environment(cr, SUPERUSER_ID, {})[PROFILE_MODEL].create(vals)
+        except Exception:
+            _logger.exception("Could not store the profile of %s", target)
+
+
+# ------------------------------------------------------------
+# Folded stacks
+# ------------------------------------------------------------
+
+def _frame_name(frame):
+    filename, _lineno, name, _line = frame[:4]
+    parts = filename.replace('\\', '/').split('/')
+    if 'addons' in parts:
+        parts = parts[parts.index('addons') + 1:]
+    return ('%s (%s)' % (name, '/'.join(parts[-3:]))).replace(';', ',')
+
+
+def _fold(stack):
+    return ';'.join(_frame_name(frame) for frame in stack) or 'root'
+
+
+def fold_samples(entries):
+    """Folded stacks of the Python samples, weighted by the time until the next sample"""
+    folded = Counter()
+    for entry, following in zip(entries, entries[1:] + [None]):
+        if following is None:
+            weight = 1
+        else:
+            weight = max(int(round((following['start'] - entry['start']) * 1000)), 1)
+        folded[_fold(entry.get('stack') or [])] += weight
+    return folded
+
+
+def fold_queries(entries):
+    """Folded stacks of the SQL statements, the statement being the leaf frame"""
+    folded = Counter()
+    for entry in entries:
+        statement = ' '.join(str(entry.get('query', '')).split())[:200].replace(';', ',')
+        stack = _fold(entry.get('stack') or [])
+        folded['%s;SQL: %s' % (stack, statement)] += max(int(round(entry['time'] * 1000)), 1)
+    return folded
+
+
+def compress_folded(folded):
+    """Base64 of the gzipped folded stacks, ready for a binary field"""
+    return base64.b64encode(gzip.compress(''.join(
+        '%s %d\n' % (stack, weight) for stack, weight in sorted(folded.items())
+    ).encode(), mtime=0))
+
+
+def build_profile_vals(profiler, target, duration):
+    entries = {collector.name: collector.entries for collector in profiler.collectors}
+    queries = entries.get('sql', [])
+    samples = entries.get('traces_async', [])
+
+    statements = Counter()
+    statement_counts = Counter()
+    record_fetches = 0
+    for entry in queries:
+        statement = ' '.join(str(entry.get('query', '')).split())
+        statements[statement] += entry['time']
+        statement_counts[statement] += 1
+        # Reads issued to fill the record cache
+        if any(frame[2] == '_fetch_query' for frame in entry.get('stack') or []):
+            record_fetches += 1
+    summary = '\n'.join(
+        '%8.2f ms %5d x  %s' % (total * 1000, statement_counts[statement], statement[:300])
+        for statement, total in statements.most_common(20)
+    )
+
+    basename = '%s-%s' % (target.replace('.', '_'), time.strftime('%Y%m%d%H%M%S'))
+    return {
+        'target': target,
+        'duration': duration * 1000,
+        'sql_count': len(queries),
+        'sql_time': sum(entry['time'] for entry in queries) * 1000,
+        'record_cache_misses': record_fetches,
+        'sql_summary': summary,
+        'samples_folded': compress_folded(fold_samples(samples)),
+        'samples_folded_name': '%s.samples.folded.gz' % basename,
+        'sql_folded': compress_folded(fold_queries(queries)),
+        'sql_folded_name': '%s.sql.folded.gz' % basename,
+        'worker_pid': os.getpid(),
+    }
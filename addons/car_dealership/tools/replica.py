@@ -0,0 +1,77 @@
+"""Routing of read-only work to the PostgreSQL read replica.
+
+Odoo 18 opens replica cursors when ``db_replica_host`` is configured. The
+helpers here add what the module needs on top of it for reporting: the
+replica is only used while its replication lag stays below the
+``car_dealership.replica_max_lag`` parameter (seconds, ``0`` disables the
+routing), and work that turns out to need the primary (a write, or a query
+cancelled by the standby because of a recovery conflict) is transparently
+run again on the primary cursor.
+"""
+import logging
+
+import psycopg2
+from psycopg2 import errors
+
+from odoo import api
+
+_logger = logging.getLogger(__name__)
+
+MAX_LAG_PARAM = 'car_dealership.replica_max_lag'
+DEFAULT_MAX_LAG = 30
+
+# 0 when the server is a primary or has replayed all it received, else the
+# age of the last replayed transaction (infinite when unknown)
+REPLICA_LAG_QUERY = """
+    SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()),
+                              'Infinity')
+           END
+"""
+
+# Errors after which the work is retried on the primary
+FALLBACK_ERRORS = (errors.ReadOnlySqlTransaction, errors.SerializationFailure)
+
+
+def get_max_lag(env, max_lag=None):
+    """Tolerated replication lag in seconds, capped by ``max_lag`` if given"""
+    try:
+        configured = float(env['ir.config_parameter'].sudo().get_param(MAX_LAG_PARAM, DEFAULT_MAX_LAG))
+    except ValueError:
+        configured = DEFAULT_MAX_LAG
+    return configured if max_lag is None else min(configured, max_lag)
+
+
+def get_replica_lag(cr):
+    cr.execute(REPLICA_LAG_QUERY)
+    return float(cr.fetchone()[0])
+
+
+def call_on_replica(env, func, max_lag=None):
+    """Return ``func(replica_env)``, or ``func(env)`` when no fresh replica is available.
+
+    ``func`` receives an environment with the same user and context as
+    ``env``. Its result must be plain data: the replica cursor is closed
+    as soon as ``func`` returns, so records bound to it cannot be used.
+    """
+    registry = env.registry
+    tolerated = get_max_lag(env, max_lag)
+    if tolerated <= 0 or getattr(registry, '_db_readonly', None) is None:
+        return func(env)
+    with registry.cursor(readonly=True) as cr:
+        try:
+            lag = get_replica_lag(cr)
+        except psycopg2.Error:
+            _logger.warning("Could not read the replication lag, using the primary", exc_info=True)
+            lag = float('inf')
+        if lag <= tolerated:
+            try:
+                return func(api.Environment(cr, env.uid, env.context))
+            except FALLBACK_ERRORS as error:
+                _logger.info("Read replica could not complete %s (%s), retrying on the primary",
+                             getattr(func, '__qualname__', func), error.pgcode)
+                cr.rollback()
+        else:
+            _logger.info("Read replica lags %.1fs behind (max %ss), using the primary", lag, tolerated)
+    return func(env)
@@ -0,0 +1,109 @@
+"""Faceted search counts over the available inventory"""
+import numpy as np
+
+from .vehicle_index import AvailableVehicleIndex, CategoryEncoder
+
+# Lower bounds of the year and price bands; band 0 is everything below the
+# first bound and the last band is open-ended
+YEAR_BANDS = (2005, 2010, 2015, 2020, 2023)
+PRICE_BANDS = (5000, 10000, 20000, 35000, 50000, 75000, 100000)
+
+ID_FACETS = ('make_id', 'model_id', 'fleet_category_id')
+SELECTION_FACETS = ('fuel_type', 'transmission', 'condition')
+BAND_FACETS = {'year_band': YEAR_BANDS, 'price_band': PRICE_BANDS}
+FACETS = ('make_id', 'model_id', 'year_band', 'price_band',
+          'fuel_type', 'transmission', 'condition', 'fleet_category_id')
+
+
+def band_labels(bounds):
+    """Display labels of the bands defined by ``bounds``, a band holding
+    the values from its lower bound up to the next bound excluded"""
+    labels = ['< %s' % bounds[0]]
+    for low, high in zip(bounds, bounds[1:]):
+        labels.append('%s - %s' % (low, high - 1))
+    labels.append('%s+' % bounds[-1])
+    return labels
+
+
+class VehicleFacetIndex(AvailableVehicleIndex):
+    """One small integer code array per facet of the available vehicles.
+
+    Filtering a facet is a vectorized comparison of its code array (a
+    bitmap over the snapshot rows), counting is a bincount of the codes
+    under the other facets' bitmaps.
+    """
+    columns = (
+        'COALESCE(make_id, 0)', 'COALESCE(model_id, 0)', 'COALESCE(year, 0)',
+        'COALESCE(selling_price, 0)', 'fuel_type', 'transmission', 'condition',
+        'COALESCE(fleet_category_id, 0)', 'COALESCE(branch_id, 0)',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.encoders = {facet: CategoryEncoder() for facet in SELECTION_FACETS}
+
+    def _encode_rows(self, rows):
+        (make, model, year, price, fuel, transmission, condition,
+         category, branch) = zip(*rows) if rows else ((),) * len(self.columns)
+        return {
+            'make_id': np.array(make, dtype=np.int32),
+            'model_id': np.array(model, dtype=np.int32),
+            'year_band': np.searchsorted(YEAR_BANDS, np.array(year, dtype=np.int32), side='right').astype(np.int32),
+            'price_band': np.searchsorted(PRICE_BANDS, np.array(price, dtype=np.float64), side='right').astype(np.int32),
+            'fuel_type': self.encoders['fuel_type'].encode(fuel),
+            'transmission': self.encoders['transmission'].encode(transmission),
+            'condition': self.encoders['condition'].encode(condition),
+            'fleet_category_id': np.array(category, dtype=np.int32),
+            'branch_id': np.array(branch, dtype=np.int32),
+        }
+
+    def _encode_values(self, facet, values):
+        if facet in self.encoders:
+            return [self.encoders[facet].get(value) for value in values]
+        return [int(value) for value in values]
+
+    def _decode_values(self, facet, codes):
+        if facet in self.encoders:
+            values = {code: value for value, code in self.encoders[facet].codes.items()}
+            return [values.get(code) for code in codes]
+        return codes
+
+    def search(self, filters, branch_ids=None):
+        """Return (ids, {facet: {value: count}}) of the vehicles matching ``filters``.
+
+        ``filters`` maps facets to accepted values: values are OR-ed within a
+        facet and facets AND-ed. The counts of a facet ignore its own filter
+        so its other values stay selectable. ``branch_ids`` restricts the
+        snapshot to these branches and vehicles without branch.
+        """
+        with self.lock:
+            base = self.alive.copy()
+            if branch_ids is not None:
+                base &= np.isin(self.arrays['branch_id'], list(branch_ids) + [0])
+            masks = {
+                facet: np.isin(self.arrays[facet], self._encode_values(facet, values))
+                for facet, values in filters.items() if facet in FACETS and values
+            }
+            matched = base.copy()
+            for mask in masks.values():
+                matched &= mask
+            ids = self.ids[matched].tolist()
+
+            counts = {}
+            for facet in FACETS:
+                if facet in masks:
+                    selection = base.copy()
+                    for other, mask in masks.items():
+                        if other != facet:
+                            selection &= mask
+                else:
+                    selection = matched
+                codes = self.arrays[facet][selection]
+                if facet not in BAND_FACETS:
+                    # 0 is "not set" for records and selections
+                    codes = codes[codes > 0]
+                tally = np.bincount(codes) if len(codes) else np.zeros(0, dtype=np.int64)
+                present = np.flatnonzero(tally)
+                counts[facet] = dict(zip(
+                    self._decode_values(facet, present.tolist()), tally[present].tolist()))
+        return ids, counts
@@ -0,0 +1,163 @@
+"""In-memory snapshots of the available dealership inventory.
+
+Each worker keeps one snapshot per database and index class. A snapshot is
+loaded once and then kept in sync incrementally: every query first reads
+only the vehicles whose ``write_date`` moved past the last seen one, and a
+full reload only happens when the available count no longer matches
+(vehicles were deleted).
+
+Snapshots are shared by all the requests of a worker, so they are synced
+from a cursor of their own and only ever hold committed rows.
+"""
+from datetime import datetime, timedelta
+import threading
+
+import numpy as np
+
+# Rows committed by transactions that started before the last sync can
+# carry an older write_date; re-read that window on every sync.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+WATERMARK_EPOCH = datetime(1970, 1, 1)
+
+AVAILABLE_CONDITION = "state = 'available' AND NOT COALESCE(is_template_dummy, false)"
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+class AvailableVehicleIndex:
+    """Base class of the available inventory snapshots.
+
+    Subclasses list the SQL ``columns`` they need and encode fetched rows
+    into named NumPy arrays (one row per vehicle) in ``_encode_rows``.
+    """
+    columns = ()
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.watermark = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.arrays = {}
+        self.positions = {}
+
+    @classmethod
+    def for_env(cls, env):
+        """Return the synchronized snapshot of the environment's database"""
+        key = (cls, env.cr.dbname)
+        with _instances_lock:
+            index = _instances.get(key)
+            if index is None:
+                index = _instances[key] = cls()
+        # Shares the test transaction in test mode
+        env['dealership.vehicle'].flush_model()
+        with env.registry.cursor() as cr:
+            index.sync(cr)
+        return index
+
+    @classmethod
+    def discard(cls, dbname):
+        with _instances_lock:
+            _instances.pop((cls, dbname), None)
+
+    def __len__(self):
+        return len(self.positions)
+
+    # ------------------------------------------------------------
+    # Encoding, implemented by subclasses
+    # ------------------------------------------------------------
+
+    def _encode_rows(self, rows):
+        """Return {name: array} with one entry per row (rows exclude id)"""
+        raise NotImplementedError()
+
+    # ------------------------------------------------------------
+    # Synchronization
+    # ------------------------------------------------------------
+
+    def _select(self):
+        return "SELECT id, write_date, %s, %s FROM dealership_vehicle" % (
+            AVAILABLE_CONDITION, ', '.join(self.columns))
+
+    def sync(self, cr):
+        with self.lock:
+            if self.watermark is None:
+                self._full_load(cr)
+                return
+            cr.execute(self._select() + " WHERE write_date > %s",
+                       (self.watermark - WATERMARK_OVERLAP,))
+            rows = cr.fetchall()
+            if rows:
+                self._apply(rows)
+            cr.execute("SELECT count(*) FROM dealership_vehicle WHERE " + AVAILABLE_CONDITION)
+            if cr.fetchone()[0] != len(self.positions):
+                self._full_load(cr)
+
+    def _full_load(self, cr):
+        cr.execute("SELECT max(write_date) FROM dealership_vehicle")
+        self.watermark = cr.fetchone()[0] or WATERMARK_EPOCH
+        cr.execute(self._select() + " WHERE " + AVAILABLE_CONDITION + " ORDER BY id")
+        rows = cr.fetchall()
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.alive = np.ones(len(rows), dtype=bool)
+        self.positions = {vehicle_id: pos for pos, vehicle_id in enumerate(self.ids.tolist())}
+        self.arrays = self._encode_rows([row[3:] for row in rows])
+
+    def _apply(self, rows):
+        removed = [row[0] for row in rows if not row[2]]
+        upserts = [row for row in rows if row[2]]
+        for vehicle_id in removed:
+            pos = self.positions.pop(vehicle_id, None)
+            if pos is not None:
+                self.alive[pos] = False
+        if upserts:
+            encoded = self._encode_rows([row[3:] for row in upserts])
+            new_rows = [i for i, row in enumerate(upserts) if row[0] not in self.positions]
+            existing = [i for i, row in enumerate(upserts) if row[0] in self.positions]
+            if existing:
+                positions = np.array([self.positions[upserts[i][0]] for i in existing])
+                for name, array in self.arrays.items():
+                    array[positions] = encoded[name][existing]
+            if new_rows:
+                start = len(self.ids)
+                self.ids = np.concatenate([self.ids, np.array([upserts[i][0] for i in new_rows], dtype=np.int64)])
+                self.alive = np.concatenate([self.alive, np.ones(len(new_rows), dtype=bool)])
+                for name, array in self.arrays.items():
+                    self.arrays[name] = np.concatenate([array, encoded[name][new_rows]])
+                for offset, i in enumerate(new_rows):
+                    self.positions[upserts[i][0]] = start + offset
+        write_dates = [row[1] for row in rows if row[1]]
+        if write_dates:
+            self.watermark = max(self.watermark, max(write_dates))
+        if len(self.ids) > 64 and len(self.positions) < len(self.ids) * 0.75:
+            self._compact()
+
+    def _compact(self):
+        keep = self.alive
+        self.ids = self.ids[keep]
+        self.arrays = {name: array[keep] for name, array in self.arrays.items()}
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.positions = {vehicle_id: pos for pos, vehicle_id in enumerate(self.ids.tolist())}
+
+
+class CategoryEncoder:
+    """Stable integer codes for categorical values (0 means empty)"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        codes = self.codes
+        result = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if not value:
+                result[i] = 0
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(codes) + 1
+            result[i] = code
+        return result
+
+    def get(self, value):
+        return self.codes.get(value, -1) if value else 0
@@ -0,0 +1,55 @@
+"""k-nearest-neighbour search over the available inventory"""
+import numpy as np
+
+from .vehicle_index import AvailableVehicleIndex, CategoryEncoder
+
+# year, mileage, selling price (standardized before weighting)
+NUMERIC_WEIGHTS = np.array([1.0, 1.0, 1.5], dtype=np.float32)
+# body type, fuel type, transmission, condition, make, model (mismatch penalty)
+CATEGORY_WEIGHTS = np.array([1.0, 0.5, 0.5, 0.75, 0.5, 1.0], dtype=np.float32)
+
+
+class VehicleSimilarityIndex(AvailableVehicleIndex):
+    """Compact feature matrix of the available vehicles"""
+    columns = (
+        'COALESCE(year, 0)', 'COALESCE(mileage, 0)', 'COALESCE(selling_price, 0)',
+        'fleet_category_id', 'fuel_type', 'transmission', 'condition', 'make_id', 'model_id',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.encoders = [CategoryEncoder() for _weight in CATEGORY_WEIGHTS]
+
+    def _encode_rows(self, rows):
+        numeric = np.array([row[:3] for row in rows], dtype=np.float32).reshape(-1, 3)
+        categories = np.zeros((len(rows), len(self.encoders)), dtype=np.int32)
+        for column, encoder in enumerate(self.encoders):
+            categories[:, column] = encoder.encode([row[3 + column] for row in rows])
+        return {'numeric': numeric, 'categories': categories}
+
+    def nearest(self, numeric_values, category_values, k, exclude_id=None):
+        """Return [(vehicle_id, distance)] of the k closest available vehicles"""
+        with self.lock:
+            mask = self.alive.copy()
+            if exclude_id in self.positions:
+                mask[self.positions[exclude_id]] = False
+            candidates = np.flatnonzero(mask)
+            if not len(candidates) or k <= 0:
+                return []
+            ids = self.ids[candidates]
+            numeric = self.arrays['numeric'][candidates]
+            categories = self.arrays['categories'][candidates]
+            query_codes = np.array(
+                [encoder.get(value) for encoder, value in zip(self.encoders, category_values)],
+                dtype=np.int32)
+
+        scale = numeric.std(axis=0)
+        scale[scale == 0] = 1.0
+        diff = (numeric - np.asarray(numeric_values, dtype=np.float32)) / scale
+        distance = (diff * diff) @ NUMERIC_WEIGHTS
+        distance += (categories != query_codes) @ CATEGORY_WEIGHTS
+
+        k = min(k, len(ids))
+        top = np.argpartition(distance, k - 1)[:k]
+        top = top[np.argsort(distance[top], kind='stable')]
+        return list(zip(ids[top].tolist(), distance[top].tolist()))
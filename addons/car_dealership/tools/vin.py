@@ -0,0 +1,159 @@
+"""Offline VIN normalization, validation and decoding (ISO 3779 / ISO 3780).
+
+All functions work on whole batches: the 17 character VINs of a batch are
+packed in one (n, 17) byte matrix and checked with vectorized lookups.
+"""
+from collections import namedtuple
+import csv
+import datetime
+import functools
+import os
+import re
+
+import numpy as np
+
+from odoo.tools import LazyTranslate
+
+_lt = LazyTranslate(__name__)
+
+VIN_LENGTH = 17
+CHECK_DIGIT_POSITION = 8
+MODEL_YEAR_POSITION = 9
+# Position weights of the check digit computation
+WEIGHTS = np.array([8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int32)
+TRANSLITERATION = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+TRANSLITERATION.update({str(digit): digit for digit in range(10)})
+# Model year codes, cycling every 30 years from 1980
+YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+# The check digit is mandatory for North American manufacturers only
+CHECK_DIGIT_REGIONS = '12345'
+REGIONS = [
+    ('ABCDEFGH', 'Africa'), ('J', 'Japan'), ('KLMNPR', 'Asia'),
+    ('STUVWXYZ', 'Europe'), ('12345', 'North America'), ('67', 'Oceania'), ('89', 'South America'),
+]
+WMI_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'vin_wmi.csv')
+
+# Frame numbers of Japanese domestic market vehicles, which have no 17
+# character VIN: the model code (series letters, digits and an optional
+# variant letter, as in NZE121, BNR32, CT9A or EK9), a dash and a 5 to 7
+# digit serial. Like VINs they never contain I, O or Q.
+CHASSIS_NUMBER_RE = re.compile(r'^[A-HJ-NPR-Z]{1,4}[0-9]{1,3}[A-HJ-NPR-Z]?-[0-9]{5,7}$')
+
+_VALUE_TABLE = np.full(256, -1, dtype=np.int32)
+for _char, _value in TRANSLITERATION.items():
+    _VALUE_TABLE[ord(_char)] = _value
+
+VinInfo = namedtuple('VinInfo', [
+    'vin', 'error', 'check_digit_valid', 'wmi', 'manufacturer', 'country', 'model_year',
+])
+
+ERROR_LENGTH = 'length'
+ERROR_CHARACTERS = 'characters'
+ERROR_CHECK_DIGIT = 'check_digit'
+
+ERROR_MESSAGES = {
+    ERROR_LENGTH: _lt('a VIN has 17 characters'),
+    ERROR_CHARACTERS: _lt('only letters and digits are allowed, except I, O and Q'),
+    ERROR_CHECK_DIGIT: _lt('the check digit (9th character) does not match'),
+}
+
+
+def normalize_vin(value):
+    """Uppercase and remove whitespace; keep falsy values as they are"""
+    if not value:
+        return value
+    return re.sub(r'\s+', '', str(value)).upper()
+
+
+@functools.lru_cache(maxsize=1)
+def load_wmi_table():
+    """{wmi: (manufacturer, country)} from the table packaged with the module"""
+    table = {}
+    with open(WMI_FILE, newline='', encoding='utf-8') as wmi_file:
+        for row in csv.DictReader(wmi_file):
+            table[row['wmi'].strip().upper()] = (row['manufacturer'].strip(), row['country'].strip())
+    return table
+
+
+def _lookup_wmi(wmi, table):
+    # 3 character codes first, then manufacturer-wide 2 character prefixes
+    return table.get(wmi) or table.get(wmi[:2])
+
+
+def _region(first_char):
+    for chars, region in REGIONS:
+        if first_char in chars:
+            return region
+    return ''
+
+
+def decode_model_year(vin, current_year=None):
+    """Model year from the 10th character, resolving the 30 year cycle"""
+    code = vin[MODEL_YEAR_POSITION]
+    offset = YEAR_CODES.find(code)
+    if offset < 0:
+        return False
+    current_year = current_year or datetime.date.today().year
+    candidates = [1980 + offset, 2010 + offset]
+    if vin[0] in CHECK_DIGIT_REGIONS:
+        # North American rule: a letter in position 7 means 2010 onwards
+        return candidates[1] if vin[6].isalpha() else candidates[0]
+    plausible = [year for year in candidates if year <= current_year + 1]
+    return max(plausible) if plausible else candidates[0]
+
+
+def compute_check_digits(vins):
+    """Expected check digit characters of a list of 17 character VINs"""
+    if not vins:
+        return np.zeros(0, dtype='U1')
+    matrix = np.frombuffer(''.join(vins).encode('ascii'), dtype=np.uint8).reshape(-1, VIN_LENGTH)
+    remainders = (_VALUE_TABLE[matrix] * WEIGHTS).sum(axis=1) % 11
+    return np.where(remainders == 10, 'X', remainders.astype('U2'))
+
+
+def validate_vins(values, current_year=None):
+    """Normalize, validate and decode a batch of VINs.
+
+    Returns one VinInfo per value. Chassis numbers (see CHASSIS_NUMBER_RE)
+    are accepted as they are, without decoding. The check digit is only an
+    error for North American manufacturers, where it is mandatory; elsewhere
+    it is reported through ``check_digit_valid``.
+    """
+    vins = [normalize_vin(value) or '' for value in values]
+    results = [None] * len(vins)
+    candidates = []
+    for i, vin in enumerate(vins):
+        if len(vin) == VIN_LENGTH and vin.isascii():
+            candidates.append(i)
+        elif CHASSIS_NUMBER_RE.match(vin):
+            results[i] = VinInfo(vin, False, False, '', '', '', False)
+        else:
+            results[i] = VinInfo(vin, ERROR_LENGTH, False, '', '', '', False)
+    if not candidates:
+        return results
+
+    batch = [vins[i] for i in candidates]
+    matrix = np.frombuffer(''.join(batch).encode('ascii'), dtype=np.uint8).reshape(-1, VIN_LENGTH)
+    valid_chars = (_VALUE_TABLE[matrix] >= 0).all(axis=1)
+    expected = compute_check_digits(batch)
+    actual = matrix[:, CHECK_DIGIT_POSITION].view('S1').astype('U1').ravel()
+    check_ok = valid_chars & (expected == actual)
+
+    table = load_wmi_table()
+    for row, i in enumerate(candidates):
+        vin = vins[i]
+        if not valid_chars[row]:
+            results[i] = VinInfo(vin, ERROR_CHARACTERS, False, '', '', '', False)
+            continue
+        wmi = vin[:3]
+        manufacturer, country = _lookup_wmi(wmi, table) or ('', _region(vin[0]))
+        error = False
+        if not check_ok[row] and vin[0] in CHECK_DIGIT_REGIONS:
+            error = ERROR_CHECK_DIGIT
+        results[i] = VinInfo(vin, error, bool(check_ok[row]), wmi, manufacturer, country,
+                             decode_model_year(vin, current_year))
+    return results
@@ -0,0 +1,2 @@
+from . import dealership_vehicle_reprice
+from . import dealership_vehicle_settlement
@@ -0,0 +1,247 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import logging
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 5000
+PREVIEW_LIMIT = 200
+
+
+class DealershipVehicleReprice(models.TransientModel):
+    """Rule-based bulk repricing of dealership vehicles"""
+    _name = 'dealership.vehicle.reprice'
+    _description = 'Dealership Vehicle Bulk Repricing'
+
+    # Selection
+    state_filter = fields.Selection([
+        ('available', 'Available'),
+        ('draft', 'Draft'),
+        ('all', 'Draft and Available'),
+    ], string='Vehicles', default='available', required=True)
+    make_ids = fields.Many2many('fleet.vehicle.model.brand', string='Makes')
+    model_ids = fields.Many2many('fleet.vehicle.model', string='Models')
+    year_from = fields.Integer('Year From')
+    year_to = fields.Integer('Year To')
+    vehicle_ids = fields.Many2many(
+        'dealership.vehicle', string='Selected Vehicles',
+        help="Limit the repricing to these vehicles (filled from the list selection).")
+
+    # Rules (percentages)
+    markup = fields.Float('Markup (%)', default=20.0,
+                          help="Markup applied on the cost price.")
+    yearly_depreciation = fields.Float('Depreciation per Year (%)', default=2.0)
+    mileage_depreciation = fields.Float('Depreciation per 10,000 km (%)', default=1.0)
+    max_depreciation = fields.Float('Maximum Depreciation (%)', default=30.0)
+    new_factor = fields.Float('Brand New Factor', default=1.0)
+    foreign_used_factor = fields.Float('Foreign Used Factor', default=0.97)
+    local_used_factor = fields.Float('Local Used Factor', default=0.9)
+    electrified_premium = fields.Float(
+        'Hybrid/Electric Premium (%)', default=3.0)
+    aging_discount = fields.Float(
+        'Discount per 30 Days in Stock (%)', default=1.0)
+    max_aging_discount = fields.Float('Maximum Aging Discount (%)', default=10.0)
+    min_margin = fields.Float(
+        'Minimum Margin (%)', default=5.0,
+        help="The new price never goes below cost plus this margin.")
+    rounding = fields.Float('Round To', default=1000.0)
+
+    # Preview
+    line_ids = fields.One2many(
+        'dealership.vehicle.reprice.line', 'wizard_id', string='Preview', readonly=True)
+    vehicle_count = fields.Integer('Vehicles to Reprice', readonly=True)
+    total_change = fields.Float('Total Price Change', readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'dealership.vehicle' and self.env.context.get('active_ids'):
+            res['vehicle_ids'] = [(6, 0, self.env.context['active_ids'])]
+        return res
+
+    def _get_vehicle_domain(self):
+        self.ensure_one()
+        domain = [('purchase_price', '>', 0)]
+        if self.state_filter == 'all':
+            domain.append(('state', 'in', ['draft', 'available']))
+        else:
+            domain.append(('state', '=', self.state_filter))
+        if self.vehicle_ids:
+            domain.append(('id', 'in', self.vehicle_ids.ids))
+        if self.make_ids:
+            domain.append(('make_id', 'in', self.make_ids.ids))
+        if self.model_ids:
+            domain.append(('model_id', 'in', self.model_ids.ids))
+        if self.year_from:
+            domain.append(('year', '>=', self.year_from))
+        if self.year_to:
+            domain.append(('year', '<=', self.year_to))
+        return domain
+
+    def _load_pricing_inputs(self):
+        """Load the pricing inputs of all matching vehicles as columnar arrays"""
+        ids = self.env['dealership.vehicle'].search(self._get_vehicle_domain(), order='id').ids
+        if not ids:
+            return None
+        self.env.cr.execute("""
+            SELECT id, COALESCE(year, 0), COALESCE(mileage, 0),
+                   COALESCE(condition, ''), COALESCE(fuel_type, ''),
+                   COALESCE(purchase_price, 0), COALESCE(selling_price, 0),
+                   COALESCE(days_in_stock, 0)
+              FROM dealership_vehicle
+             WHERE id = ANY(%s)
+             ORDER BY id
+        """, (ids,))
+        rows = self.env.cr.fetchall()
+        columns = list(zip(*rows))
+        return {
+            'id': np.array(columns[0], dtype=np.int64),
+            'year': np.array(columns[1], dtype=np.int32),
+            'mileage': np.array(columns[2], dtype=np.float64),
+            'condition': np.array(columns[3], dtype=object),
+            'fuel_type': np.array(columns[4], dtype=object),
+            'purchase_price': np.array(columns[5], dtype=np.float64),
+            'selling_price': np.array(columns[6], dtype=np.float64),
+            'days_in_stock': np.array(columns[7], dtype=np.float64),
+        }
+
+    def _compute_prices(self, inputs):
+        """Apply the repricing rules to the input arrays, return new prices"""
+        self.ensure_one()
+        current_year = fields.Date.context_today(self).year
+        age = np.where(inputs['year'] > 0, np.clip(current_year - inputs['year'], 0, None), 0)
+        depreciation = np.minimum(
+            age * self.yearly_depreciation + inputs['mileage'] / 10000.0 * self.mileage_depreciation,
+            self.max_depreciation) / 100.0
+        condition_factor = np.select(
+            [inputs['condition'] == 'new',
+             inputs['condition'] == 'foreign_used',
+             inputs['condition'] == 'local_used'],
+            [self.new_factor, self.foreign_used_factor, self.local_used_factor],
+            default=1.0)
+        fuel_factor = np.where(
+            np.isin(inputs['fuel_type'], ['hybrid', 'electric']),
+            1.0 + self.electrified_premium / 100.0, 1.0)
+        aging = np.minimum(
+            np.floor(inputs['days_in_stock'] / 30.0) * self.aging_discount,
+            self.max_aging_discount) / 100.0
+
+        cost = inputs['purchase_price']
+        prices = (cost * (1.0 + self.markup / 100.0) * (1.0 - depreciation)
+                  * condition_factor * fuel_factor * (1.0 - aging))
+        prices = np.maximum(prices, cost * (1.0 + self.min_margin / 100.0))
+        if self.rounding > 0:
+            prices = np.round(prices / self.rounding) * self.rounding
+        return np.round(prices, 2)
+
+    def _get_changes(self):
+        inputs = self._load_pricing_inputs()
+        if inputs is None:
+            return None, None, None
+        prices = self._compute_prices(inputs)
+        changed = np.abs(prices - inputs['selling_price']) >= 0.01
+        return inputs['id'][changed], inputs['selling_price'][changed], prices[changed]
+
+    def action_preview(self):
+        """Dry run: show the resulting prices without writing anything"""
+        self.ensure_one()
+        ids, old_prices, new_prices = self._get_changes()
+        self.line_ids.unlink()
+        if ids is None or not len(ids):
+            self.write({'vehicle_count': 0, 'total_change': 0.0})
+        else:
+            order = np.argsort(-np.abs(new_prices - old_prices))[:PREVIEW_LIMIT]
+            self.write({
+                'vehicle_count': len(ids),
+                'total_change': float(np.sum(new_prices - old_prices)),
+                'line_ids': [(0, 0, {
+                    'vehicle_id': int(ids[i]),
+                    'current_price': float(old_prices[i]),
+                    'new_price': float(new_prices[i]),
+                }) for i in order],
+            })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_apply(self):
+        self.ensure_one()
+        ids, old_prices, new_prices = self._get_changes()
+        if ids is None or not len(ids):
+            raise UserError(_('No vehicle price changes with these rules.'))
+        self._write_prices(ids.tolist(), new_prices.tolist())
+        _logger.info("Repriced %s dealership vehicles", len(ids))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Repricing done'),
+                'message': _('%s vehicles repriced.', len(ids)),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    def _write_prices(self, ids, prices):
+        """Write the new prices and sync the product templates in SQL batches.
+
+        Bypasses the ORM write (and with it per-record tracking and
+        _update_product) while keeping the stored analytics and the
+        template list price consistent.
+        """
+        cr = self.env.cr
+        for start in range(0, len(ids), WRITE_BATCH_SIZE):
+            batch_ids = ids[start:start + WRITE_BATCH_SIZE]
+            batch_prices = prices[start:start + WRITE_BATCH_SIZE]
+            cr.execute("""
+                UPDATE dealership_vehicle v
+                   SET selling_price = c.price,
+                       margin = c.price - COALESCE(v.purchase_price, 0),
+                       price_per_km = CASE WHEN v.mileage > 0 THEN c.price / v.mileage ELSE 0 END,
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::numeric[]) AS price) c
+                 WHERE v.id = c.id
+            """, (self.env.uid, batch_ids, batch_prices))
+            # Same rule as _update_product: only template vehicles own their product
+            cr.execute("""
+                UPDATE product_template t
+                   SET list_price = c.price,
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::numeric[]) AS price) c
+                  JOIN dealership_vehicle v ON v.id = c.id
+                  JOIN product_product p ON p.id = v.product_id
+                 WHERE t.id = p.product_tmpl_id
+                   AND v.is_template_dummy
+            """, (self.env.uid, batch_ids, batch_prices))
+        self.env['dealership.vehicle'].invalidate_model(
+            ['selling_price', 'margin', 'price_per_km', 'write_uid', 'write_date'])
+        self.env['dealership.vehicle']._refresh_company_amounts(ids=ids)
+        self.env['product.template'].invalidate_model(['list_price', 'write_uid', 'write_date'])
+
+
+class DealershipVehicleRepriceLine(models.TransientModel):
+    _name = 'dealership.vehicle.reprice.line'
+    _description = 'Dealership Vehicle Repricing Preview Line'
+    _order = 'id'
+
+    wizard_id = fields.Many2one(
+        'dealership.vehicle.reprice', required=True, ondelete='cascade')
+    vehicle_id = fields.Many2one('dealership.vehicle', string='Vehicle', readonly=True)
+    currency_id = fields.Many2one(related='vehicle_id.currency_id')
+    current_price = fields.Monetary('Current Price', currency_field='currency_id', readonly=True)
+    new_price = fields.Monetary('New Price', currency_field='currency_id', readonly=True)
+    difference = fields.Monetary(
+        'Difference', currency_field='currency_id', compute='_compute_difference')
+
+    @api.depends('current_price', 'new_price')
+    def _compute_difference(self):
+        for line in self:
+            line.difference = line.new_price - line.current_price
@@ -0,0 +1,164 @@
+from odoo import models, fields, api, Command, _
+from odoo.exceptions import UserError
+from dateutil.relativedelta import relativedelta
+import logging
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+SETTLED_BUSINESS_TYPES = ('consigned', 'dealer_network')
+
+# One row per vendor and currency holding the columns of its sold vehicles
+# that are not on a vendor bill yet (cancelled bills do not count)
+SETTLEMENT_QUERY = """
+    SELECT veh.vendor_id,
+           COALESCE(veh.currency_id, company.currency_id),
+           array_agg(veh.id ORDER BY veh.sold_date, veh.id),
+           array_agg(COALESCE(veh.selling_price, 0) ORDER BY veh.sold_date, veh.id),
+           array_agg(COALESCE(veh.commission_type, 'percentage') ORDER BY veh.sold_date, veh.id),
+           array_agg(COALESCE(veh.commission_value, 0) ORDER BY veh.sold_date, veh.id)
+      FROM dealership_vehicle veh
+      JOIN res_company company ON company.id = veh.company_id
+     WHERE veh.company_id = %(company_id)s
+       AND veh.state = 'sold'
+       AND veh.business_type IN %(business_types)s
+       AND veh.vendor_id IS NOT NULL
+       AND veh.sold_date BETWEEN %(date_from)s AND %(date_to)s
+       AND NOT EXISTS (
+            SELECT 1
+              FROM account_move_line aml
+              JOIN account_move move ON move.id = aml.move_id
+             WHERE aml.vehicle_id = veh.id
+               AND move.move_type IN ('in_invoice', 'in_refund')
+               AND move.state != 'cancel')
+     GROUP BY veh.vendor_id, COALESCE(veh.currency_id, company.currency_id)
+     ORDER BY veh.vendor_id
+"""
+
+
+class DealershipVehicleSettlement(models.TransientModel):
+    """Vendor bills of the sold dealer network and consigned vehicles.
+
+    Each vendor gets one draft bill per period and currency paying the
+    selling price of its vehicles minus the dealership commission. The
+    bill lines carry the vehicle, so settling a period again only bills
+    the vehicles sold since.
+    """
+    _name = 'dealership.vehicle.settlement'
+    _description = 'Dealership Vendor Settlement'
+
+    def _default_date_from(self):
+        return fields.Date.context_today(self).replace(day=1) - relativedelta(months=1)
+
+    def _default_date_to(self):
+        return fields.Date.context_today(self).replace(day=1) - relativedelta(days=1)
+
+    date_from = fields.Date('From', required=True, default=_default_date_from)
+    date_to = fields.Date('To', required=True, default=_default_date_to)
+    company_id = fields.Many2one(
+        'res.company', string='Company', required=True, default=lambda self: self.env.company)
+
+    @api.model
+    def _compute_commissions(self, prices, commission_types, commission_values, decimal_places):
+        """Commission of each vehicle, never negative nor above its selling price"""
+        commissions = np.where(
+            commission_types == 'percentage', prices * commission_values / 100.0, commission_values)
+        return np.round(np.minimum(np.maximum(commissions, 0.0), prices), decimal_places)
+
+    @api.model
+    def _get_settlement_rows(self, date_from, date_to, company):
+        self.env['dealership.vehicle'].flush_model([
+            'vendor_id', 'currency_id', 'company_id', 'state', 'business_type',
+            'sold_date', 'selling_price', 'commission_type', 'commission_value'])
+        self.env['account.move.line'].flush_model(['vehicle_id', 'move_id'])
+        self.env['account.move'].flush_model(['move_type', 'state'])
+        self.env.cr.execute(SETTLEMENT_QUERY, {
+            'company_id': company.id,
+            'business_types': SETTLED_BUSINESS_TYPES,
+            'date_from': date_from,
+            'date_to': date_to,
+        })
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _settle(self, date_from, date_to, company):
+        """Create the vendor bills of the period, return them"""
+        # Serializes concurrent settlements: the second one sees the first's bills
+        self.env.cr.execute("SELECT pg_advisory_xact_lock(hashtext('car_dealership.settlement'), %s)", (company.id,))
+        rows = self._get_settlement_rows(date_from, date_to, company)
+        if not rows:
+            return self.env['account.move']
+
+        journal = self.env['account.journal'].search([
+            *self.env['account.journal']._check_company_domain(company),
+            ('type', '=', 'purchase'),
+        ], limit=1)
+        if not journal:
+            raise UserError(_('No purchase journal found for %s.', company.name))
+        commission_account = self.env.ref('car_dealership.account_dealership_commission', raise_if_not_found=False)
+        if not commission_account or company not in commission_account.company_ids:
+            commission_account = journal.default_account_id
+
+        vehicles = self.env['dealership.vehicle'].browse([
+            vehicle_id for row in rows for vehicle_id in row[2]])
+        vehicles.fetch(['name', 'vin_number'])
+        currencies = self.env['res.currency'].browse({row[1] for row in rows})
+        ref = _('Vehicle settlement %(date_from)s - %(date_to)s', date_from=date_from, date_to=date_to)
+
+        vals_list = []
+        for vendor_id, currency_id, vehicle_ids, prices, commission_types, commission_values in rows:
+            currency = currencies.browse(currency_id)
+            prices = np.array(prices, dtype=np.float64)
+            commissions = self._compute_commissions(
+                prices, np.array(commission_types, dtype=object),
+                np.array(commission_values, dtype=np.float64), currency.decimal_places)
+            lines = []
+            for vehicle, price, commission in zip(
+                    vehicles.browse(vehicle_ids), prices.tolist(), commissions.tolist()):
+                label = '%s (VIN: %s)' % (vehicle.name, vehicle.vin_number or '-')
+                lines.append(Command.create({
+                    'name': label,
+                    'vehicle_id': vehicle.id,
+                    'quantity': 1,
+                    'price_unit': price,
+                    'tax_ids': [Command.clear()],
+                }))
+                if commission:
+                    lines.append(Command.create({
+                        'name': _('Commission on %s', label),
+                        'vehicle_id': vehicle.id,
+                        'account_id': commission_account.id,
+                        'quantity': 1,
+                        'price_unit': -commission,
+                        'tax_ids': [Command.clear()],
+                    }))
+            vals_list.append({
+                'move_type': 'in_invoice',
+                'partner_id': vendor_id,
+                'company_id': company.id,
+                'journal_id': journal.id,
+                'currency_id': currency_id,
+                'invoice_date': date_to,
+                'ref': ref,
+                'invoice_line_ids': lines,
+            })
+        bills = self.env['account.move'].create(vals_list)
+        _logger.info("Settled %s dealership vehicles on %s vendor bills", len(vehicles), len(bills))
+        return bills
+
+    def action_settle(self):
+        self.ensure_one()
+        if self.date_from > self.date_to:
+            raise UserError(_('The start of the period must be before its end.'))
+        bills = self._settle(self.date_from, self.date_to, self.company_id)
+        if not bills:
+            raise UserError(_('No sold dealer network or consigned vehicle left to settle in this period.'))
+        return {
+            'name': _('Vendor Settlements'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', bills.ids)],
+            'context': {'default_move_type': 'in_invoice'},
+        }